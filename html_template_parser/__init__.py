@@ -1,3 +1,9 @@
 """HTML template parser package"""
+from html_template_parser.version import __version__
 from html_template_parser.parser import *
+from html_template_parser.environment import *
+from html_template_parser.optimizer import *
+from html_template_parser.scanner import *
 from html_template_parser.error import *
+from html_template_parser.model import *
+from html_template_parser.registry import *
@@ -1,5 +1,9 @@
 import abc
+import collections
+import itertools
+import threading
 from html_template_parser.error import *
+from html_template_parser.model import *
 from html_template_parser.utils import *
 
 
@@ -13,30 +17,44 @@ def push_stack(func):
     return func_wrapper
 
 
+def iter_child_nodes(node):
+    """Yields direct children of node, including nodes kept in lists of statements or arguments.
+    Nodes only referenced by node, like macro bound to its call, are not its children."""
+    for name, value in vars(node).items():
+        if name in node.references:
+            continue
+        if isinstance(value, ParserNode):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, ParserNode):
+                    yield item
+                elif isinstance(item, (list, tuple)):
+                    yield from (child for child in item if isinstance(child, ParserNode))
+
+
+def defines_names(statements):
+    """Whether statements add names to the frame of block they are placed in."""
+    return any(isinstance(statement, (SetStatement, MacroStatement)) for statement in statements or [])
+
+
+def copy_location(node, original):
+    """Moves source location of original expression to node replacing it."""
+    if original.offset is not None:
+        node.offset = original.offset
+        node.line_index = original.line_index
+    return node
+
+
 class ScopeContext:
-    def __init__(self, model=None, format='csv'):
+    def __init__(self, model=None, format='csv', storage='rows', background=None, model_cache=False, registry=None):
         self.model = [{'model': []}]
-        if model:
-            self._load_model(model, format)
-
-    def _load_model(self, model, format):
-        if format is 'csv':
-            with open(model) as f:
-                import csv
-                reader = csv.DictReader(f)
-                for row in reader:
-                    row = convert_strings_to_numbers(row)
-                    self.model[0]['model'].append(row)
-        elif format is 'json':
-            with open(model) as f:
-                import json
-                self.model.append(json.load(f))
-        elif format is 'yaml':
-            with open(model) as f:
-                import yaml
-                self.model.append(yaml.load(f))
-        else:
-            raise ParserArgumentError('Invalid argument value \'{}\''.format(format))
+        self._free_frames = []
+        if model and registry:
+            self.model.append(registry.get(model, format, storage, background, model_cache))
+            self.model.append({})
+        elif model:
+            self.model.append(load_model(model, format, storage, background, model_cache))
 
     def find(self, identifier):
             for level in reversed(self.model):
@@ -46,18 +64,38 @@ class ScopeContext:
                     pass
             raise UnknownIdentifier('Unknown identifier \'{}\''.format(identifier))
 
+    def find_from(self, identifier, depth):
+        """Finds identifier like find, skipping depth innermost frames."""
+        model = self.model
+        for i in range(len(model) - 1 - depth, -1, -1):
+            level = model[i]
+            if identifier in level:
+                return level[identifier]
+        raise UnknownIdentifier('Unknown identifier \'{}\''.format(identifier))
+
     def add(self, identifier, value):
         self.model[-1][identifier] = value
 
     def push(self):
-        self.model.append({})
+        self.model.append(self._free_frames.pop() if self._free_frames else {})
 
     def pop(self):
-        self.model.pop()
+        frame = self.model.pop()
+        frame.clear()
+        self._free_frames.append(frame)
 
 
 class ParserNode:
-    line = None
+    offset = None
+    line_index = None
+    references = ()
+
+    @property
+    def line(self):
+        """Line number of node, computed only when needed by error message."""
+        if self.offset is None:
+            return None
+        return self.line_index.line(self.offset)
 
     def execute(self, scope_context):
         try:
@@ -72,15 +110,96 @@ class ParserNode:
         pass
 
 
-class RootNode(ParserNode):
+class StatementNode(ParserNode):
+    """Node producing output. Output is appended to one list shared by whole render
+    and joined once, instead of concatenating strings of nested statements."""
+
+    def do_execute(self, scope_context):
+        output = []
+        self.render(scope_context, output)
+        return ''.join(output)
+
+    @abc.abstractmethod
+    def render(self, scope_context, output):
+        pass
+
+    def stream(self, scope_context):
+        """Yields output of node in chunks, block statements yield output of each nested statement
+        as soon as it is rendered."""
+        output = []
+        self.render(scope_context, output)
+        yield from output
+
+
+def render_statements(statements, scope_context, output):
+    for statement in statements:
+        statement.render(scope_context, output)
+
+
+class RootNode(StatementNode):
+    """Statements and expressions inside the tree are executed without per node error handling.
+    Error raised during render is caught here once and reported with line of the innermost
+    expression being executed, found in traceback and looked up in table of expression lines.
+    Expressions of statements and arguments of macro calls have their own lines, errors raised
+    by statement itself, like iterating over int, are reported with line of its expression."""
+
+    _expression_lines = None
+
     def __init__(self, subtrees):
         self.subtrees = subtrees
 
-    def do_execute(self, scope_context):
-        generated_html = ''
-        for subtree in self.subtrees:
-            generated_html += subtree.do_execute(scope_context)
-        return generated_html
+    def execute(self, scope_context):
+        try:
+            return self.do_execute(scope_context)
+        except (TypeError, ZeroDivisionError, UnknownIdentifier) as exc:
+            raise ParserSemanticError(exc, self.error_line(exc))
+        except KeyError as exc:
+            raise ParserSemanticError('Unknown key {}'.format(exc), self.error_line(exc))
+
+    def render(self, scope_context, output):
+        render_statements(self.subtrees, scope_context, output)
+
+    def stream(self, scope_context):
+        try:
+            for subtree in self.subtrees:
+                yield from subtree.stream(scope_context)
+        except (TypeError, ZeroDivisionError, UnknownIdentifier) as exc:
+            raise ParserSemanticError(exc, self.error_line(exc))
+        except KeyError as exc:
+            raise ParserSemanticError('Unknown key {}'.format(exc), self.error_line(exc))
+
+    def error_line(self, exc):
+        """Line of the innermost expression executed by statement or macro call when exc was raised."""
+        if self._expression_lines is None:
+            self._expression_lines = self._collect_expression_lines()
+        frames = []
+        traceback = exc.__traceback__
+        while traceback:
+            frames.append(traceback.tb_frame)
+            traceback = traceback.tb_next
+        for frame in reversed(frames):
+            node = frame.f_locals.get('self')
+            if isinstance(node, ParserNode) and node in self._expression_lines:
+                return self._expression_lines[node]
+        return self.line
+
+    def _collect_expression_lines(self):
+        lines = {}
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            for child in iter_child_nodes(node):
+                if isinstance(node, (StatementNode, MacroCall)) and not isinstance(child, StatementNode):
+                    lines[child] = child.line
+                    if isinstance(node, StatementNode):
+                        lines[node] = child.line
+                nodes.append(child)
+        return lines
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_expression_lines', None)
+        return state
 
 
 class Constant(ParserNode):
@@ -92,11 +211,25 @@ class Constant(ParserNode):
 
 
 class Variable(ParserNode):
+    depth = 0
+
     def __init__(self, identifier):
         self.identifier = identifier
 
     def do_execute(self, scope_context):
-        return scope_context.find(self.identifier)
+        return scope_context.find_from(self.identifier, self.depth)
+
+
+class BoundVariable(Variable):
+    """Variable known to be defined in frame at given depth from the innermost one."""
+
+    def __init__(self, identifier, depth):
+        self.identifier = identifier
+        self.depth = depth
+        self.index = -1 - depth
+
+    def do_execute(self, scope_context):
+        return scope_context.model[self.index][self.identifier]
 
 
 class Indexing(ParserNode):
@@ -258,91 +391,230 @@ class InOperator(ParserNode):
         return self.operand1.do_execute(scope_context) in self.operand2.do_execute(scope_context)
 
 
-class HTMLCode(ParserNode):
+class HTMLCode(StatementNode):
     def __init__(self, html):
         self.html = html
 
-    def do_execute(self, scope_context):
-        return self.html
+    def render(self, scope_context, output):
+        output.append(self.html)
 
 
-class PrintStatement(ParserNode):
+class PrintStatement(StatementNode):
     def __init__(self, expression):
         self.expression = expression
 
-    def do_execute(self, scope_context):
-        return str(self.expression.execute(scope_context))
+    def render(self, scope_context, output):
+        output.append(str(self.expression.do_execute(scope_context)))
 
 
-class IfStatement(ParserNode):
+class IfStatement(StatementNode):
+    """Frame is pushed only when branches set names or define macros, nested loops
+    and conditions push their own frames."""
+    pushes_frame = True
+
     def __init__(self, comp_expression, inside_statements, else_statement):
         self.comp_expression = comp_expression
         self.inside_statements = inside_statements
         self.else_statement = else_statement
+        self.pushes_frame = defines_names(inside_statements) or defines_names(else_statement)
 
-    @push_stack
-    def do_execute(self, scope_context):
-        result = ''
-        if self.comp_expression.execute(scope_context):
-            for statement in self.inside_statements:
-                result += statement.execute(scope_context)
+    def render(self, scope_context, output):
+        if not self.pushes_frame:
+            self._render_branch(scope_context, output)
+        else:
+            scope_context.push()
+            self._render_branch(scope_context, output)
+            scope_context.pop()
+
+    def _render_branch(self, scope_context, output):
+        if self.comp_expression.do_execute(scope_context):
+            render_statements(self.inside_statements, scope_context, output)
         elif self.else_statement:
-            for statement in self.else_statement:
-                result += statement.execute(scope_context)
-        return result
+            render_statements(self.else_statement, scope_context, output)
 
+    def stream(self, scope_context):
+        if not self.pushes_frame:
+            yield from self._stream_branch(scope_context)
+            return
+        scope_context.push()
+        try:
+            yield from self._stream_branch(scope_context)
+        finally:
+            scope_context.pop()
+
+    def _stream_branch(self, scope_context):
+        if self.comp_expression.do_execute(scope_context):
+            statements = self.inside_statements
+        else:
+            statements = self.else_statement or []
+        for statement in statements:
+            yield from statement.stream(scope_context)
+
+
+class ForStatement(StatementNode):
+    """Loop whose body is condition without else comparing columns of loop variable with
+    constants, besides static HTML, gets predicate of the condition from Resolver. Predicate
+    is pushed down to collections filtering rows themselves, like SQLiteRelation, while
+    condition is still checked for rows they return. Static HTML of loop body is written
+    for each row filtered out, so that output does not change."""
+    END = object()
+    predicate = None
+    skipped_output = ''
 
-class ForStatement(ParserNode):
     def __init__(self, identifier, collection, inside_statements):
         self.identifier = identifier
         self.collection = collection
         self.inside_statements = inside_statements
 
     @push_stack
-    def do_execute(self, scope_context):
-        result = ''
-        for element in self.collection.execute(scope_context):
+    def render(self, scope_context, output):
+        collection = self.collection.do_execute(scope_context)
+        if self.predicate is not None and isinstance(collection, SQLiteRelation):
+            return self._render_filtered(collection, scope_context, output)
+        for element in collection:
             scope_context.add(self.identifier, element)
-            for statement in self.inside_statements:
-                result += statement.execute(scope_context)
-        return result
-
-
-class SetStatement(ParserNode):
+            render_statements(self.inside_statements, scope_context, output)
+
+    def _render_filtered(self, collection, scope_context, output):
+        for skipped, element in self.elements(collection):
+            if skipped:
+                output.append(self.skipped_output * skipped)
+            if element is not self.END:
+                scope_context.add(self.identifier, element)
+                render_statements(self.inside_statements, scope_context, output)
+
+    def stream(self, scope_context):
+        """Frame is popped also when rendering fails or consumer closes the stream early."""
+        scope_context.push()
+        try:
+            collection = self.collection.do_execute(scope_context)
+            if self.predicate is not None and isinstance(collection, SQLiteRelation):
+                yield from self._stream_filtered(collection, scope_context)
+            else:
+                for element in collection:
+                    scope_context.add(self.identifier, element)
+                    for statement in self.inside_statements:
+                        yield from statement.stream(scope_context)
+        finally:
+            scope_context.pop()
+
+    def _stream_filtered(self, collection, scope_context):
+        for skipped, element in self.elements(collection):
+            if skipped:
+                yield self.skipped_output * skipped
+            if element is not self.END:
+                scope_context.add(self.identifier, element)
+                for statement in self.inside_statements:
+                    yield from statement.stream(scope_context)
+
+    def elements(self, collection):
+        """Returns iterator of elements of collection, each one with number of rows filtered out
+        before it, then number of rows filtered out at the end with END."""
+        rows = None
+        if self.predicate is not None and isinstance(collection, SQLiteRelation):
+            rows = collection.filter(self.predicate, bool(self.skipped_output))
+        if rows is None:
+            return zip(itertools.repeat(0), collection)
+        return ((skipped, self.END if row is None else row) for skipped, row in rows)
+
+
+class SetStatement(StatementNode):
     def __init__(self, identifier, value):
         self.identifier = identifier
         self.value = value
 
-    def do_execute(self, scope_context):
-        scope_context.add(self.identifier, self.value.execute(scope_context))
-        return ''
+    def render(self, scope_context, output):
+        scope_context.add(self.identifier, self.value.do_execute(scope_context))
 
 
-class MacroStatement(ParserNode):
+class MacroStatement(StatementNode):
+    """Macro reading only its arguments, constants and its own loop variables is marked
+    as pure by Resolver. Output of pure macro can be memoized with MacroMemo.
+    Macro defined once at top level, whose name is not bound anywhere else, is hoisted:
+    calls are bound to it by Resolver and it can be called before its definition."""
+    ARITY_ERROR = 'Macro \'{}\' takes {} arguments, {} given'
+    pure = False
+    memo = None
+    hoisted = False
+
     def __init__(self, identifier, args_name, inside_statements):
         self.identifier = identifier
         self.args_name = args_name
         self.inside_statements = inside_statements
 
-    def do_execute(self, scope_context):
+    def render(self, scope_context, output):
         scope_context.add(self.identifier, self)
-        return ''
 
-    @push_stack
-    def __call__(self, *args, **kwargs):
-        scope_context = args[0]
-        for i, arg_name in enumerate(self.args_name):
-            scope_context.add(arg_name, args[1][i].execute(scope_context))
-        result = ''
-        for statement in self.inside_statements:
-            result += statement.execute(scope_context)
+    def __call__(self, scope_context, *args):
+        if self.memo is None:
+            return self._call(scope_context, *args)
+        return self.memo.call(self._call, args, scope_context)
+
+    def _call(self, scope_context, *args):
+        if len(args) != len(self.args_name):
+            raise TypeError(self.ARITY_ERROR.format(self.identifier, len(self.args_name), len(args)))
+        scope_context.push()
+        scope_context.model[-1].update(zip(self.args_name, args))
+        output = []
+        render_statements(self.inside_statements, scope_context, output)
+        scope_context.pop()
+        return ''.join(output)
+
+
+class MacroMemo:
+    """Bounded LRU cache of macro output, keyed on argument values and their types.
+    Calls with unhashable arguments are not cached. On miss, function is called
+    with context followed by args."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def call(self, function, args, *context):
+        key = args + tuple(map(type, args))
+        try:
+            result = self._cache.get(key)
+        except TypeError:
+            return function(*context, *args)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+            return result
+        result = function(*context, *args)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = result
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
         return result
 
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._cache), self.maxsize)
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
+
 
 class MacroCall(ParserNode):
+    depth = 0
+    macro = None
+    references = ('macro',)
+
     def __init__(self, identifier, *args):
         self.identifier = identifier
         self.args = args
 
     def do_execute(self, scope_context):
-        return scope_context.find(self.identifier)(scope_context, *self.args)
+        macro = self.macro or scope_context.find_from(self.identifier, self.depth)
+        return macro(scope_context, *[arg.do_execute(scope_context) for arg in self.args[0]])
@@ -0,0 +1,308 @@
+import marshal
+import math
+
+from html_template_parser.action import *
+from html_template_parser.error import *
+
+__all__ = [
+    'CompiledTemplate'
+]
+
+_BINARY_OPERATORS = {
+    AdditionOperator: '+',
+    SubtractionOperator: '-',
+    MultiplicationOperator: '*',
+    DivisionOperator: '/',
+    ModuloOperator: '%',
+    NotEqualOperator: '!=',
+    EqualOperator: '==',
+    LowerOrEqualOperator: '<=',
+    GreaterOrEqualOperator: '>=',
+    LowerOperator: '<',
+    GreaterOperator: '>',
+    OrOperator: 'or',
+    AndOperator: 'and',
+    InOperator: 'in'
+}
+
+_UNARY_OPERATORS = {
+    NotOperator: 'not ',
+    MinusOperator: '-',
+    PlusOperator: '+'
+}
+
+_ERROR_HANDLERS = [
+    'except (TypeError, ZeroDivisionError, UnknownIdentifier) as exc:',
+    '    raise ParserSemanticError(exc, _line)',
+    'except KeyError as exc:',
+    '    raise ParserSemanticError(\'Unknown key {}\'.format(exc), _line)'
+]
+
+
+class CompiledTemplate:
+    """Node tree compiled into a Python function. Loops and conditions become native
+    for and if statements, expressions are inlined. Scoping is still done by ScopeContext,
+    so generated code renders exactly what RootNode.execute renders. Besides render,
+    generator function stream is compiled, yielding output of top level statements.
+    Errors are reported with the same lines as RootNode reports them, arguments of macro
+    calls set the line while they are evaluated."""
+
+    def __init__(self, tree):
+        generator = CodeGenerator()
+        self.source = generator.generate(tree)
+        self.code = compile(self.source, '<template>', 'exec')
+        self._constants = generator.constants
+        self._render, self._stream = self._load(self.code, self._constants)
+
+    @staticmethod
+    def _load(code, constants):
+        namespace = {
+            'ParserSemanticError': ParserSemanticError,
+            'UnknownIdentifier': UnknownIdentifier,
+            '_constants': constants,
+            '_END': ForStatement.END
+        }
+        exec(code, namespace)
+        return namespace['render'], namespace['stream']
+
+    def execute(self, scope_context):
+        return self._render(scope_context)
+
+    def stream(self, scope_context):
+        return self._stream(scope_context)
+
+    def __getstate__(self):
+        return {'source': self.source, 'code': marshal.dumps(self.code), 'constants': self._constants}
+
+    def __setstate__(self, state):
+        self.source = state['source']
+        self.code = marshal.loads(state['code'])
+        self._constants = state['constants']
+        self._render, self._stream = self._load(self.code, self._constants)
+
+
+class CodeGenerator:
+    """Generates source of render(scope_context) and stream(scope_context) functions from node tree."""
+
+    def __init__(self):
+        self.constants = []
+        self._lines = []
+        self._indent = 0
+        self._names = 0
+        self._write = '_write({})'
+        self._macro_names = {}
+        self._line = None
+
+    def generate(self, tree):
+        self._function('render', tree.subtrees)
+        self._write = 'yield {}'
+        self._function('stream', tree.subtrees, streaming=True)
+        self._write = '_write({})'
+        return '\n'.join(self._lines) + '\n'
+
+    def _function(self, name, statements, streaming=False):
+        self._emit('def {}(_context):'.format(name))
+        self._indent += 1
+        self._emit('_find = _context.find')
+        self._emit('_find_from = _context.find_from')
+        self._emit('_model = _context.model')
+        self._emit('_add = _context.add')
+        self._emit('_push = _context.push')
+        self._emit('_pop = _context.pop')
+        hoisted = [statement for statement in statements if isinstance(statement, MacroStatement) and statement.hoisted]
+        for statement in hoisted:
+            self._macro_names[statement] = self._unique_name('_memo' if statement.memo else '_macro')
+        for statement in hoisted:
+            self._macro_function(statement, self._macro_names[statement])
+        if streaming:
+            self._emit('yield from ()')
+            self._emit('_line = None')
+            self._emit('try:')
+            self._block(statements)
+            for line in _ERROR_HANDLERS:
+                self._emit(line)
+        else:
+            self._function_body(statements)
+        self._indent -= 1
+
+    def _emit(self, line):
+        self._lines.append('    ' * self._indent + line)
+
+    def _unique_name(self, prefix):
+        self._names += 1
+        return '{}_{}'.format(prefix, self._names)
+
+    def _function_body(self, statements, prologue=(), epilogue=()):
+        """Emits body of function rendering statements into its own output list."""
+        self._emit('_out = []')
+        self._emit('_write = _out.append')
+        self._emit('_line = None')
+        self._emit('try:')
+        self._indent += 1
+        for line in prologue:
+            self._emit(line)
+        self._statements(statements)
+        self._indent -= 1
+        for line in _ERROR_HANDLERS:
+            self._emit(line)
+        for line in epilogue:
+            self._emit(line)
+        self._emit('return \'\'.join(_out)')
+
+    def _statements(self, statements):
+        if not statements:
+            self._emit('pass')
+        for statement in statements:
+            self._statement(statement)
+
+    def _statement(self, node):
+        if isinstance(node, HTMLCode):
+            self._emit(self._write.format(repr(node.html)))
+        elif isinstance(node, PrintStatement):
+            self._set_line(node.expression)
+            self._emit(self._write.format('str({})'.format(self._expression(node.expression))))
+        elif isinstance(node, IfStatement):
+            if node.pushes_frame:
+                self._push()
+            self._set_line(node.comp_expression)
+            self._emit('if {}:'.format(self._expression(node.comp_expression)))
+            self._block(node.inside_statements)
+            if node.else_statement:
+                self._emit('else:')
+                self._block(node.else_statement)
+            if node.pushes_frame:
+                self._pop()
+        elif isinstance(node, ForStatement) and node.predicate is not None:
+            self._filtered_loop(node)
+        elif isinstance(node, ForStatement):
+            element = self._unique_name('_element')
+            self._push()
+            self._set_line(node.collection)
+            self._emit('for {} in {}:'.format(element, self._expression(node.collection)))
+            self._indent += 1
+            self._emit('_add({!r}, {})'.format(node.identifier, element))
+            self._statements(node.inside_statements)
+            self._indent -= 1
+            self._pop()
+        elif isinstance(node, SetStatement):
+            self._set_line(node.value)
+            self._emit('_add({!r}, {})'.format(node.identifier, self._expression(node.value)))
+        elif isinstance(node, MacroStatement):
+            self._macro(node)
+        else:
+            raise ParserArgumentError('Cannot compile node {}'.format(type(node).__name__))
+
+    def _filtered_loop(self, node):
+        """Emits loop over ForStatement.elements, writing static HTML of rows filtered out."""
+        element = self._unique_name('_element')
+        skipped = self._unique_name('_skipped')
+        self._push()
+        self._set_line(node.collection)
+        self._emit('for {}, {} in {}.elements({}):'.format(skipped, element, self._constant(node),
+                                                          self._expression(node.collection)))
+        self._indent += 1
+        if node.skipped_output:
+            self._emit('if {}:'.format(skipped))
+            self._emit('    ' + self._write.format('{!r} * {}'.format(node.skipped_output, skipped)))
+            self._emit('if {} is _END:'.format(element))
+            self._emit('    continue')
+        self._emit('_add({!r}, {})'.format(node.identifier, element))
+        self._statements(node.inside_statements)
+        self._indent -= 1
+        self._pop()
+
+    def _push(self):
+        """Emits push of frame, popped in finally clause by stream, which may be closed early."""
+        self._emit('_push()')
+        if self._write.startswith('yield'):
+            self._emit('try:')
+            self._indent += 1
+
+    def _pop(self):
+        if self._write.startswith('yield'):
+            self._indent -= 1
+            self._emit('finally:')
+            self._emit('    _pop()')
+        else:
+            self._emit('_pop()')
+
+    def _block(self, statements):
+        self._indent += 1
+        self._statements(statements)
+        self._indent -= 1
+
+    def _macro(self, node):
+        if node.hoisted:
+            name = self._macro_names[node]
+        else:
+            name = self._macro_function(node)
+        self._emit('_add({!r}, {})'.format(node.identifier, name))
+
+    def _macro_function(self, node, name=None):
+        """Emits function rendering macro and returns name of its callable. Name of hoisted
+        macro is reserved before its body is emitted, so the body can call it."""
+        name = name or self._unique_name('_memo' if node.memo else '_macro')
+        function = self._unique_name('_macro') if node.memo else name
+        write, self._write = self._write, '_write({})'
+        self._emit('def {}(*_args):'.format(function))
+        self._indent += 1
+        self._emit('if len(_args) != {}:'.format(len(node.args_name)))
+        self._emit('    raise TypeError({!r}.format(len(_args)))'.format(
+            MacroStatement.ARITY_ERROR.format(node.identifier, len(node.args_name), '{}')))
+        self._emit('_push()')
+        self._emit('_model[-1].update(zip({!r}, _args))'.format(tuple(node.args_name)))
+        self._function_body(node.inside_statements, epilogue=['_pop()'])
+        self._indent -= 1
+        self._write = write
+        if node.memo:
+            self._emit('{} = lambda *_args: {}.call({}, _args)'.format(name, self._constant(node.memo), function))
+        return name
+
+    def _set_line(self, expression):
+        self._line = expression.line
+        self._emit('_line = {!r}'.format(expression.line))
+
+    def _argument(self, node):
+        """Returns code of macro call argument, setting _line to line of argument while it is
+        evaluated and back to line of enclosing expression afterwards."""
+        if node.line == self._line:
+            return self._expression(node)
+        line, self._line = self._line, node.line
+        code = self._expression(node)
+        self._line = line
+        return '(_line := {!r}, {}, _line := {!r})[1]'.format(node.line, code, line)
+
+    def _expression(self, node):
+        node_type = type(node)
+        if node_type in _BINARY_OPERATORS:
+            return '({} {} {})'.format(self._expression(node.operand1), _BINARY_OPERATORS[node_type],
+                                       self._expression(node.operand2))
+        elif node_type in _UNARY_OPERATORS:
+            return '({}{})'.format(_UNARY_OPERATORS[node_type], self._expression(node.operand))
+        elif node_type is Constant:
+            return self._constant(node.value)
+        elif node_type is Variable:
+            return self._lookup(node)
+        elif node_type is BoundVariable:
+            return '_model[{}][{!r}]'.format(node.index, node.identifier)
+        elif node_type is Indexing:
+            return '{}[{}]'.format(self._expression(node.variable), self._expression(node.index))
+        elif node_type is MacroCall:
+            args = ', '.join(self._argument(arg) for arg in node.args[0])
+            if node.macro:
+                return '{}({})'.format(self._macro_names[node.macro], args)
+            return '{}({})'.format(self._lookup(node), args)
+        else:
+            raise ParserArgumentError('Cannot compile node {}'.format(node_type.__name__))
+
+    @staticmethod
+    def _lookup(node):
+        if node.depth:
+            return '_find_from({!r}, {})'.format(node.identifier, node.depth)
+        return '_find({!r})'.format(node.identifier)
+
+    def _constant(self, value):
+        if type(value) in (int, str, bool) or (type(value) is float and math.isfinite(value)):
+            return repr(value)
+        self.constants.append(value)
+        return '_constants[{}]'.format(len(self.constants) - 1)
@@ -0,0 +1,178 @@
+import collections
+import hashlib
+import importlib.util
+import os
+import pickle
+import threading
+
+from html_template_parser.optimizer import *
+from html_template_parser.parser import *
+from html_template_parser.scanner import *
+from html_template_parser.utils import CacheInfo, atomic_write
+from html_template_parser.version import __version__
+
+__all__ = [
+    'Environment',
+    'CacheInfo'
+]
+
+
+class _CacheEntry:
+    def __init__(self, template, checksum, mtime=None, size=None):
+        self.template = template
+        self.checksum = checksum
+        self.mtime = mtime
+        self.size = size
+
+
+class Environment:
+    """Loads templates and keeps parsed Template objects in bounded LRU cache.
+    Templates read from files are revalidated by mtime and size, then by content hash,
+    templates given as strings are cached by content hash only.
+    With cache_dir, parsed templates are also pickled to disk, so that new processes
+    load them instead of parsing. Files are keyed by content hash, library and Python
+    version, and written atomically, so one directory can be shared by many processes.
+    With registry, models of renders are loaded once and shared (see ModelRegistry)."""
+
+    def __init__(self, cache_size=400, encoding='utf-8', tokenizer_class=Scanner, cache_dir=None,
+                 backend='interpreter', optimize=False, macro_cache_size=None, registry=None):
+        self.cache_size = cache_size
+        self.encoding = encoding
+        self.tokenizer_class = tokenizer_class
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.optimize = optimize
+        self.macro_cache_size = macro_cache_size
+        self.registry = registry
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_template(self, path):
+        """Returns parsed template located at path, parsing it only when file has changed."""
+        stat = os.stat(path)
+        key = ('path', os.path.abspath(path))
+        with self._lock:
+            entry = self._lookup(key)
+            if entry and (entry.mtime, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self.hits += 1
+                return entry.template
+        with open(path, encoding=self.encoding) as f:
+            source = f.read()
+        checksum = self.checksum(source)
+        hit = entry is not None and entry.checksum == checksum
+        if not hit:
+            entry = _CacheEntry(self._parse(source, checksum), checksum)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            entry.mtime, entry.size = stat.st_mtime_ns, stat.st_size
+            self._store(key, entry)
+        return entry.template
+
+    def from_string(self, source):
+        """Returns parsed template of source, cached by its content hash."""
+        checksum = self.checksum(source)
+        key = ('string', checksum)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry:
+                self.hits += 1
+                return entry.template
+        entry = _CacheEntry(self._parse(source, checksum), checksum)
+        with self._lock:
+            self.misses += 1
+            self._store(key, entry)
+        return entry.template
+
+    def render(self, path, model=None, format='csv', backend=None, filter_blank_lines=True, storage='rows',
+               background=None, model_cache=False):
+        return parse(self.get_template(path), model, format, backend=backend or self.backend,
+                     filter_blank_lines=filter_blank_lines, storage=storage, background=background,
+                     model_cache=model_cache, registry=self.registry)
+
+    def render_stream(self, path, model=None, format='csv', backend=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      filter_blank_lines=True, storage='rows', background=None, model_cache=False):
+        return render_stream(self.get_template(path), model, format, backend=backend or self.backend,
+                             chunk_size=chunk_size, filter_blank_lines=filter_blank_lines, storage=storage,
+                             background=background, model_cache=model_cache, registry=self.registry)
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._cache), self.cache_size,
+                             self.disk_hits)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def checksum(source):
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    def _parse(self, source, checksum):
+        if self.cache_dir:
+            template = self._load_from_disk(checksum)
+            if template:
+                return template
+        template = Template.from_source(source, self.tokenizer_class, Optimizer() if self.optimize else None,
+                                        self.macro_cache_size)
+        template.get_executable(self.backend)
+        if self.cache_dir:
+            self._store_on_disk(checksum, template)
+        return template
+
+    def _cache_path(self, checksum):
+        key = '{}:{}:{}:{}:{}:{}'.format(checksum, __version__, importlib.util.MAGIC_NUMBER.hex(), self.backend,
+                                         self.optimize, self.macro_cache_size)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+    def _load_from_disk(self, checksum):
+        path = self._cache_path(checksum)
+        try:
+            with open(path, 'rb') as f:
+                template = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        if not isinstance(template, Template):
+            self._remove(path)
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return template
+
+    def _store_on_disk(self, checksum, template):
+        try:
+            data = pickle.dumps(template, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        atomic_write(self._cache_path(checksum), data)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _lookup(self, key):
+        entry = self._cache.get(key)
+        if entry:
+            self._cache.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
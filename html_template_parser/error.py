@@ -1,4 +1,7 @@
+import bisect
+
 __all__ = [
+    'LineIndex',
     'ParserError',
     'ParserSyntaxError',
     'ParserSemanticError',
@@ -21,6 +24,11 @@ class ParserError(Exception):
         self.message = '{}error: {}'.format(pos, msg)
         Exception.__init__(self, msg)
 
+    @classmethod
+    def at(cls, msg, line_index, offset):
+        """Creates error located at source offset."""
+        return cls(msg, *line_index.position(offset))
+
     def __repr__(self):
         return self.message
 
@@ -54,3 +62,47 @@ class UnknownIdentifier(Exception):
 
     def __init__(self, msg):
         Exception.__init__(self, msg)
+
+
+class LineIndex:
+    """Turns source offsets into line and position numbers. Offsets of newlines
+    are collected on the first lookup and searched with binary search.
+    Source may be str or bytes-like, newlines may also be supplied by the reader.
+    Source which is about to be closed, like mmap, is detached: its newlines are collected
+    and it is not kept, positions are then counted in bytes."""
+
+    def __init__(self, source='', newlines=None):
+        self._source = source
+        self._newlines = newlines
+
+    def line(self, offset):
+        return bisect.bisect_left(self._get_newlines(), offset) + 1
+
+    def position(self, offset):
+        """Returns (line, position) pair, both counted from 1."""
+        newlines = self._get_newlines()
+        line = bisect.bisect_left(newlines, offset)
+        line_start = newlines[line - 1] + 1 if line else 0
+        if not self._source or isinstance(self._source, str):
+            return line + 1, offset - line_start + 1
+        return line + 1, len(self._source[line_start:offset].decode(errors='ignore')) + 1
+
+    def detach(self):
+        """Collects newlines of source and drops it."""
+        self._get_newlines()
+        self._source = None
+
+    def _get_newlines(self):
+        if self._newlines is None:
+            newline = '\n' if isinstance(self._source, str) else b'\n'
+            newlines = []
+            index = self._source.find(newline)
+            while index != -1:
+                newlines.append(index)
+                index = self._source.find(newline, index + 1)
+            self._newlines = newlines
+        return self._newlines
+
+    def __getstate__(self):
+        self._get_newlines()
+        return {'_source': None, '_newlines': self._newlines}
@@ -0,0 +1,759 @@
+import array
+import codecs
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
+import csv
+import functools
+import itertools
+import json
+import os
+import pickle
+import re
+import sqlite3
+import urllib.parse
+
+from html_template_parser.error import *
+from html_template_parser.utils import RowConverter, atomic_write, infer_converter
+
+__all__ = [
+    'load_model',
+    'LazyCSVModel',
+    'LazyJSONArray',
+    'NDJSONModel',
+    'SQLiteRelation',
+    'ColumnarModel',
+    'ColumnarRow',
+    'CompactRow',
+    'compact_row_class',
+    'STORAGES',
+    'BACKGROUNDS'
+]
+
+STORAGES = ('rows', 'lazy', 'columnar', 'compact')
+BACKGROUNDS = ('thread', 'process')
+SAMPLE_SIZE = 100
+LAZY_JSON_THRESHOLD = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+# rest of buffer after decoded value which may be start of fraction or exponent of number
+_NUMBER_TAIL = re.compile(r'(?:\.|[eE][+-]?)?\Z')
+# models raise the same errors as list, so templates behave the same with every storage
+_INDEX_ERROR = 'list index out of range'
+_INDEX_TYPE_ERROR = 'list indices must be integers or slices, not {}'
+
+
+def _list_index(index, length):
+    """Returns index of model of given length counted from its start."""
+    if not isinstance(index, int):
+        raise TypeError(_INDEX_TYPE_ERROR.format(type(index).__name__))
+    if index < 0:
+        index += length
+    if not 0 <= index < length:
+        raise IndexError(_INDEX_ERROR)
+    return index
+
+
+def load_model(path, format='csv', storage='rows', background=None, cache=False):
+    """Loads model file into frame of names available in template. Storage 'rows' keeps
+    CSV rows as list of dicts, 'lazy' reads them from file while template iterates them,
+    also for JSON arrays larger than LAZY_JSON_THRESHOLD bytes in top-level object,
+    'columnar' keeps values of each column together, also for JSON lists of rows,
+    'compact' keeps CSV rows as tuples with names of columns shared by all rows.
+    Formats which cannot be stored in given way are loaded as with 'rows'.
+    Types of CSV columns are inferred from the first SAMPLE_SIZE rows. Records of 'ndjson'
+    format are always read from file while template iterates them, decoded in background
+    'thread' or 'process' when given. YAML is parsed by libyaml when available, with cache
+    parsed model is also pickled next to model file (see _load_cached). Format 'sqlite' gives
+    relation of each table and view, read while template iterates them, 'model' is relation
+    of table named model or of the only table of database."""
+    if storage not in STORAGES:
+        raise ParserArgumentError('Invalid argument value \'{}\''.format(storage))
+    if background not in BACKGROUNDS + (None,):
+        raise ParserArgumentError('Invalid argument value \'{}\''.format(background))
+    if format == 'csv':
+        if storage == 'lazy':
+            return {'model': LazyCSVModel(path)}
+        if storage == 'columnar':
+            return {'model': ColumnarModel.from_csv(path)}
+        if storage == 'compact':
+            with open(path) as f:
+                fieldnames, converters, rows = _read_csv(f)
+                row_class = compact_row_class(tuple(fieldnames))
+                return {'model': [row_class([converter(value) if converter else value
+                                             for converter, value in zip(converters, values)])
+                                  for values in rows]}
+        with open(path) as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+        convert = RowConverter(reader.fieldnames or [], rows[:SAMPLE_SIZE])
+        return {'model': [convert(row) for row in rows]}
+    elif format == 'json':
+        if storage == 'lazy':
+            return _load_lazy_json(path)
+        with open(path) as f:
+            data = json.load(f)
+        if storage == 'columnar' and isinstance(data, dict):
+            for key, value in data.items():
+                data[key] = ColumnarModel.from_rows(value) or value
+        return data
+    elif format == 'ndjson':
+        model = NDJSONModel(path, background)
+        if storage == 'columnar':
+            rows = list(model)
+            return {'model': ColumnarModel.from_rows(rows) or rows}
+        return {'model': model}
+    elif format == 'sqlite':
+        return _load_sqlite(path)
+    elif format == 'yaml':
+        if cache:
+            return _load_cached(path, _load_yaml)
+        return _load_yaml(path)
+    else:
+        raise ParserArgumentError('Invalid argument value \'{}\''.format(format))
+
+
+def _load_sqlite(path):
+    with contextlib.closing(_connect_sqlite(path)) as connection:
+        names = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+                                                      "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'")]
+    frame = {name: SQLiteRelation(path, name) for name in names}
+    if 'model' not in frame and len(names) == 1:
+        frame['model'] = frame[names[0]]
+    return frame
+
+
+def _connect_sqlite(path):
+    os.stat(path)
+    return sqlite3.connect('file:{}?mode=ro'.format(urllib.parse.quote(os.path.abspath(path))), uri=True)
+
+
+def _load_yaml(path):
+    import yaml
+    with open(path) as f:
+        return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def _load_cached(path, load):
+    """Returns model loaded by load, pickled to sidecar file path + '.cache' together with
+    modification time and size of model file, which must match when model is read back."""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cache_path = path + '.cache'
+    try:
+        with open(cache_path, 'rb') as f:
+            if pickle.load(f) == key:
+                return pickle.load(f)
+    except Exception:
+        # missing, stale or broken cache is replaced
+        pass
+    model = load(path)
+    try:
+        atomic_write(cache_path, pickle.dumps(key, pickle.HIGHEST_PROTOCOL) +
+                     pickle.dumps(model, pickle.HIGHEST_PROTOCOL))
+    except (OSError, pickle.PicklingError):
+        pass
+    return model
+
+
+class LazyCSVModel:
+    """CSV rows read from file each time model is iterated, only current row is kept in memory.
+    Rows are accessed by index through byte offsets of rows, collected on first use."""
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._offsets = None
+        with open(path, 'rb') as f:
+            lines = _Lines(f, encoding)
+            reader = csv.DictReader(lines)
+            self.fieldnames = reader.fieldnames or []
+            self._data_offset = lines.offset
+            self._convert = RowConverter(self.fieldnames, list(itertools.islice(reader, SAMPLE_SIZE)))
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_offset)
+            for row in csv.DictReader(_Lines(f, self.encoding), self.fieldnames):
+                yield self._convert(row)
+
+    def __len__(self):
+        return len(self._get_offsets())
+
+    def __getitem__(self, index):
+        offsets = self._get_offsets()
+        offset = offsets[_list_index(index, len(offsets))]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self._convert(next(csv.DictReader(_Lines(f, self.encoding), self.fieldnames)))
+
+    def _get_offsets(self):
+        if self._offsets is None:
+            offsets = array.array('q')
+            with open(self.path, 'rb') as f:
+                f.seek(self._data_offset)
+                lines = _Lines(f, self.encoding)
+                reader = csv.reader(lines)
+                start = lines.offset
+                for values in reader:
+                    if values:
+                        offsets.append(start)
+                    start = lines.offset
+            self._offsets = offsets
+        return self._offsets
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(type(self).__name__, self.path)
+
+
+class LazyJSONArray:
+    """JSON array read from file each time model is iterated, only current element is kept
+    in memory. Elements are accessed by index through their byte spans, collected on first use."""
+
+    def __init__(self, path, offset):
+        self.path = path
+        self.offset = offset
+        self._spans = None
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for value, _, _ in _JSONReader(f).elements():
+                yield value
+
+    def __len__(self):
+        return len(self._get_spans()) // 2
+
+    def __getitem__(self, index):
+        spans = self._get_spans()
+        index = _list_index(index, len(spans) // 2)
+        with open(self.path, 'rb') as f:
+            f.seek(spans[2 * index])
+            return json.loads(f.read(spans[2 * index + 1] - spans[2 * index]))
+
+    def _get_spans(self):
+        if self._spans is None:
+            spans = array.array('q')
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                for _, start, end in _JSONReader(f).elements():
+                    spans.append(start)
+                    spans.append(end)
+            self._spans = spans
+        return self._spans
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(type(self).__name__, self.path)
+
+
+class NDJSONModel:
+    """Records of JSON Lines file decoded each time model is iterated, one per non-blank line.
+    In background 'thread' or 'process' workers read and decode lines of file in batches of
+    BATCH_SIZE bytes, at most two batches per worker ahead of template. Records are accessed
+    by index through byte offsets of lines, collected on first use."""
+    BATCH_SIZE = 256 * 1024
+
+    def __init__(self, path, background=None, workers=None):
+        self.path = path
+        self.background = background
+        self.workers = workers or ((os.cpu_count() or 1) if background == 'process' else 1)
+        self._offsets = None
+
+    def __iter__(self):
+        if not self.background:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.isspace():
+                        yield json.loads(line)
+            return
+        executor_class = (concurrent.futures.ThreadPoolExecutor if self.background == 'thread' else
+                          concurrent.futures.ProcessPoolExecutor)
+        with executor_class(self.workers) as executor:
+            pending = collections.deque()
+            try:
+                for start in range(0, os.path.getsize(self.path), self.BATCH_SIZE):
+                    pending.append(executor.submit(_decode_lines, self.path, start, start + self.BATCH_SIZE))
+                    if len(pending) > 2 * self.workers:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __len__(self):
+        return len(self._get_offsets())
+
+    def __getitem__(self, index):
+        offsets = self._get_offsets()
+        offset = offsets[_list_index(index, len(offsets))]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _get_offsets(self):
+        if self._offsets is None:
+            offsets = array.array('q')
+            with open(self.path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if not line.isspace():
+                        offsets.append(offset)
+                    offset += len(line)
+            self._offsets = offsets
+        return self._offsets
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(type(self).__name__, self.path)
+
+
+def _decode_lines(path, start, end):
+    """Returns records of lines of file which start between start and end offsets."""
+    records = []
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            if not line.isspace():
+                records.append(json.loads(line))
+    return records
+
+
+class SQLiteRelation:
+    """Rows of SQLite table or view read from database each time model is iterated, as CompactRow.
+    Rows of tables are iterated in rowid order and can be filtered by database (see filter)."""
+    _TYPES = {int: "typeof({}) IN ('integer', 'real')",
+              float: "typeof({}) IN ('integer', 'real')",
+              str: "typeof({}) = 'text'"}
+
+    def __init__(self, path, table):
+        self.path = path
+        self.table = table
+        self._name = _quote(table)
+        with contextlib.closing(_connect_sqlite(path)) as connection:
+            cursor = connection.execute('SELECT * FROM {} LIMIT 0'.format(self._name))
+            self.columns = tuple(description[0] for description in cursor.description)
+            try:
+                connection.execute('SELECT rowid FROM {} LIMIT 0'.format(self._name))
+                self.ordered = True
+            except sqlite3.OperationalError:
+                self.ordered = False
+
+    def __iter__(self):
+        with contextlib.closing(_connect_sqlite(self.path)) as connection:
+            yield from map(compact_row_class(self.columns), connection.execute(self._select()))
+
+    def __len__(self):
+        with contextlib.closing(_connect_sqlite(self.path)) as connection:
+            return connection.execute('SELECT count(*) FROM {}'.format(self._name)).fetchone()[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, int):
+            raise TypeError(_INDEX_TYPE_ERROR.format(type(index).__name__))
+        if index < 0:
+            index += len(self)
+        values = None
+        if index >= 0:
+            with contextlib.closing(_connect_sqlite(self.path)) as connection:
+                values = connection.execute(self._select() + ' LIMIT 1 OFFSET ?', (index,)).fetchone()
+        if values is None:
+            raise IndexError(_INDEX_ERROR)
+        return compact_row_class(self.columns)(values)
+
+    def filter(self, predicate, counted=False):
+        """Returns iterator of rows, for which predicate may hold, each one with number of rows
+        skipped before it (0 when not counted), and when counted, number of rows skipped at the end
+        with None. Predicate is nested tuple of ('and' | 'or', predicate, predicate), ('not', predicate)
+        and ('compare', operator, column, constant). Rows are skipped only when comparisons surely
+        give false in Python, without raising error for values of other types. Returns None when
+        predicate refers to unknown columns or rows are not ordered."""
+        parameters = {}
+        try:
+            false, _ = self._conditions(predicate, parameters)
+        except ValueError:
+            return None
+        if not self.ordered:
+            return None
+        return self._filter(false, parameters, counted)
+
+    def _filter(self, false, parameters, counted):
+        row_class = compact_row_class(self.columns)
+        with contextlib.closing(_connect_sqlite(self.path)) as connection:
+            if not counted:
+                query = self._select('WHERE NOT {}'.format(false))
+                for values in connection.execute(query, parameters):
+                    yield 0, row_class(values)
+                return
+            connection.execute('BEGIN')
+            first, last, count = connection.execute('SELECT min(rowid), max(rowid), count(*) FROM {}'.format(
+                self._name)).fetchone()
+            if not count:
+                return
+            if last - first + 1 == count:
+                # without gaps in rowids, rows between returned ones are the skipped ones
+                previous = first - 1
+                for values in connection.execute(self._select('WHERE NOT {}'.format(false), 'rowid, *'), parameters):
+                    yield values[0] - previous - 1, row_class(values[1:])
+                    previous = values[0]
+                yield last - previous, None
+                return
+            query = ('SELECT * FROM (SELECT *, rowid AS _template_rowid, {0} AS _template_skip, '
+                     'sum({0}) OVER (ORDER BY rowid ROWS UNBOUNDED PRECEDING) AS _template_skipped '
+                     'FROM {1}) WHERE NOT _template_skip ORDER BY _template_rowid').format(false, self._name)
+            previous = 0
+            for values in connection.execute(query, parameters):
+                yield values[-1] - previous, row_class(values[:-3])
+                previous = values[-1]
+            query = 'SELECT count(*) FROM {} WHERE {}'.format(self._name, false)
+            yield connection.execute(query, parameters).fetchone()[0] - previous, None
+
+    def _conditions(self, predicate, parameters):
+        """Returns SQL conditions under which predicate surely gives false and surely gives true."""
+        if predicate[0] == 'not':
+            false, true = self._conditions(predicate[1], parameters)
+            return true, false
+        if predicate[0] in ('and', 'or'):
+            false1, true1 = self._conditions(predicate[1], parameters)
+            false2, true2 = self._conditions(predicate[2], parameters)
+            if predicate[0] == 'and':
+                return '({} OR ({} AND {}))'.format(false1, true1, false2), '({} AND {})'.format(true1, true2)
+            return '({} AND {})'.format(false1, false2), '({} OR ({} AND {}))'.format(true1, false1, true2)
+        _, operator, column, value = predicate
+        if column not in self.columns or type(value) not in self._TYPES or (type(value) is int and
+                                                                            not -2 ** 63 <= value < 2 ** 63):
+            raise ValueError('Predicate cannot be pushed down')
+        name = ':p{}'.format(len(parameters))
+        parameters[name[1:]] = value
+        same_type = self._TYPES[type(value)].format(_quote(column))
+        if operator in ('==', '!='):
+            # values of other types are never equal in Python
+            equal = '({} AND {} COLLATE BINARY = {})'.format(same_type, _quote(column), name)
+            return ('(NOT {})'.format(equal), equal) if operator == '==' else (equal, '(NOT {})'.format(equal))
+        comparison = '{} COLLATE BINARY {} {}'.format(_quote(column), operator, name)
+        return '({} AND NOT {})'.format(same_type, comparison), '({} AND {})'.format(same_type, comparison)
+
+    def _select(self, where='', columns='*'):
+        return 'SELECT {} FROM {} {} {}'.format(columns, self._name, where,
+                                               'ORDER BY rowid' if self.ordered else '').strip()
+
+    def __repr__(self):
+        return '<{} {!r} of {!r}>'.format(type(self).__name__, self.table, self.path)
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+class _JSONReader:
+    """Decodes JSON values from binary file read in chunks, keeping byte offset of
+    current position."""
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, f):
+        self.offset = f.tell()
+        self._file = f
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._ascii = True
+
+    def _fill(self):
+        """Appends next chunk of file to buffer, returns False at end of file."""
+        chunk = self._file.read(self.CHUNK_SIZE)
+        self._buffer = self._buffer[self._position:] + self._decoder.decode(chunk, not chunk)
+        self._position = 0
+        self._ascii = self._buffer.isascii()
+        return bool(chunk)
+
+    def _advance(self, position):
+        if self._ascii:
+            self.offset += position - self._position
+        else:
+            self.offset += len(self._buffer[self._position:position].encode('utf-8'))
+        self._position = position
+
+    def peek(self):
+        """Skips whitespace, returns next character or empty string at end of file."""
+        while True:
+            self._advance(_WHITESPACE.match(self._buffer, self._position).end())
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position:self._position + 1]
+
+    def take(self, chars):
+        """Skips whitespace and one of chars, returns skipped character."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('One of {!r} expected'.format(chars))
+        self._advance(self._position + 1)
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # number ending with buffer, or with its fraction or exponent cut, may continue in next chunk
+            if _NUMBER_TAIL.match(self._buffer, end) and self._fill():
+                continue
+            self._advance(end)
+            return value
+
+    def elements(self):
+        """Yields elements of array with start and end offsets of each one."""
+        self.take('[')
+        if self.peek() == ']':
+            self.take(']')
+            return
+        while True:
+            # elements followed by separator within buffer are decoded without refilling it
+            self.peek()
+            buffer, ascii = self._buffer, self._ascii
+            while True:
+                try:
+                    value, end = _DECODER.scan_once(buffer, self._position)
+                except (StopIteration, ValueError):
+                    break
+                separator = _SEPARATOR.match(buffer, end)
+                if not separator or separator.end() == len(buffer):
+                    break
+                start = self.offset
+                yield value, start, start + (end - self._position if ascii else
+                                             len(buffer[self._position:end].encode('utf-8')))
+                self._advance(separator.end())
+                if separator.group(1) == ']':
+                    return
+            start = self.offset
+            value = self.value()
+            yield value, start, self.offset
+            if self.take(',]') == ']':
+                return
+
+
+def _load_lazy_json(path):
+    """Loads top-level object of JSON file, keeping its large arrays in file. Files which
+    do not hold object are loaded whole, as well as malformed ones to report their errors."""
+    with open(path, 'rb') as f:
+        try:
+            return dict(_iter_members(path, _JSONReader(f)))
+        except ValueError:
+            f.seek(0)
+            return json.load(f)
+
+
+def _iter_members(path, reader):
+    """Yields keys and values of top-level JSON object, raises ValueError when file
+    does not hold object."""
+    reader.take('{')
+    if reader.peek() == '}':
+        reader.take('}')
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise ValueError('Key expected')
+            reader.take(':')
+            yield key, _array(path, reader) if reader.peek() == '[' else reader.value()
+            if reader.take(',}') == '}':
+                break
+    if reader.peek():
+        raise ValueError('Extra data')
+
+
+def _array(path, reader):
+    """Returns list of elements of array, or LazyJSONArray when array is larger than
+    LAZY_JSON_THRESHOLD bytes."""
+    start = reader.offset
+    elements = []
+    for value, _, end in reader.elements():
+        if elements is not None:
+            elements.append(value)
+            if end - start > LAZY_JSON_THRESHOLD:
+                elements = None
+    return LazyJSONArray(path, start) if elements is None else elements
+
+
+class ColumnarModel(collections.abc.Sequence):
+    """Rows stored column by column, columns of ints or floats are kept in arrays and
+    other columns in lists. Rows are views reading their values from columns."""
+
+    def __init__(self, columns, length):
+        self.columns = columns
+        self._length = length
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path) as f:
+            fieldnames, converters, rows = _read_csv(f)
+            columns = [[] for _ in fieldnames]
+            length = 0
+            for values in rows:
+                for column, converter, value in zip(columns, converters, values):
+                    column.append(converter(value) if converter else value)
+                length += 1
+        return cls({name: _pack(column) for name, column in zip(fieldnames, columns)}, length)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Returns model of list of dicts with the same keys, None for other values."""
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return None
+        fieldnames = list(rows[0])
+        if any(row.keys() != rows[0].keys() for row in rows):
+            return None
+        return cls({name: _pack([row[name] for row in rows]) for name in fieldnames}, len(rows))
+
+    def __iter__(self):
+        columns = self.columns
+        return (ColumnarRow(columns, index) for index in range(self._length))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        return ColumnarRow(self.columns, _list_index(index, self._length))
+
+    def __repr__(self):
+        return '<{} of {} rows>'.format(type(self).__name__, self._length)
+
+
+class ColumnarRow(collections.abc.Mapping):
+    """Read-only view of row of ColumnarModel."""
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._columns[key][self._index]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompactRow(tuple):
+    """Row stored as tuple of values, accessed by names of columns like dict. Subclass
+    holding names is created once for each header by compact_row_class. Operators and
+    indexing behave as with dict rows, so templates render the same with every storage,
+    only messages of errors name CompactRow instead of dict."""
+    __slots__ = ()
+    _fields = ()
+    _indices = {}
+
+    def __getitem__(self, key):
+        return tuple.__getitem__(self, self._indices[key])
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __contains__(self, key):
+        return key in self._indices
+
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def _unsupported(self, other):
+        return NotImplemented
+
+    __add__ = __radd__ = __mul__ = __rmul__ = __lt__ = __le__ = __gt__ = __ge__ = _unsupported
+    __hash__ = tuple.__hash__
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(tuple.__iter__(self))
+
+    def items(self):
+        return zip(self._fields, tuple.__iter__(self))
+
+    def get(self, key, default=None):
+        index = self._indices.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return _compact_row, (self._fields, tuple(tuple.__iter__(self)))
+
+
+collections.abc.Mapping.register(CompactRow)
+
+
+@functools.lru_cache(maxsize=None)
+def compact_row_class(fieldnames):
+    """Returns CompactRow subclass for tuple of names of columns."""
+    return type('CompactRow', (CompactRow,), {
+        '__slots__': (),
+        '_fields': fieldnames,
+        '_indices': {name: index for index, name in enumerate(fieldnames)}
+    })
+
+
+def _compact_row(fieldnames, values):
+    return compact_row_class(fieldnames)(values)
+
+
+def _read_csv(f):
+    """Returns names of columns, converters inferred from sample rows and iterator of all rows,
+    padded with None to length of header."""
+    reader = csv.reader(f)
+    fieldnames = next(reader, [])
+    rows = (values + [None] * (len(fieldnames) - len(values)) for values in reader if values)
+    sample = list(itertools.islice(rows, SAMPLE_SIZE))
+    converters = [infer_converter(values) for values in zip(*sample)]
+    return fieldnames, converters, itertools.chain(sample, rows)
+
+
+def _pack(values):
+    """Returns values in array when all of them are ints or all are floats."""
+    for typecode, value_type in (('q', int), ('d', float)):
+        if all(type(value) is value_type for value in values):
+            try:
+                return array.array(typecode, values)
+            except OverflowError:
+                break
+    return values
+
+
+class _Lines:
+    """Decoded lines of binary file, counting offset of the first byte not read yet."""
+
+    def __init__(self, f, encoding):
+        self.offset = f.tell()
+        self._lines = iter(f)
+        self._encoding = encoding
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._lines)
+        self.offset += len(line)
+        return line.decode(self._encoding)
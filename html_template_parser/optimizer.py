@@ -0,0 +1,121 @@
+import sys
+
+from html_template_parser.action import *
+
+__all__ = [
+    'Optimizer',
+    'count_nodes'
+]
+
+_FOLDABLE = (
+    AdditionOperator,
+    SubtractionOperator,
+    MultiplicationOperator,
+    DivisionOperator,
+    ModuloOperator,
+    NotEqualOperator,
+    EqualOperator,
+    LowerOrEqualOperator,
+    GreaterOrEqualOperator,
+    LowerOperator,
+    GreaterOperator,
+    NotOperator,
+    MinusOperator,
+    PlusOperator,
+    InOperator
+)
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in iter_child_nodes(node))
+
+
+class Optimizer:
+    """Rewrites node tree produced by Parser: folds constant subexpressions, removes
+    statically decided IfStatement branches and merges static output into single HTMLCode nodes.
+    Expressions which raise when folded are left to fail at render time with usual error."""
+
+    def __init__(self, dump=False, stream=None):
+        self.dump = dump
+        self.stream = stream
+        self.node_counts = None
+
+    def optimize(self, tree):
+        before = count_nodes(tree)
+        tree.subtrees = self._statements(tree.subtrees)
+        self.node_counts = (before, count_nodes(tree))
+        if self.dump:
+            print('nodes before optimization: {}, after: {}'.format(*self.node_counts),
+                  file=self.stream or sys.stderr)
+        return tree
+
+    def _statements(self, statements):
+        result = []
+        html = []
+        for statement in statements:
+            for node in self._statement(statement):
+                if isinstance(node, HTMLCode):
+                    html.append(node.html)
+                else:
+                    self._flush_html(html, result)
+                    result.append(node)
+        self._flush_html(html, result)
+        return result
+
+    @staticmethod
+    def _flush_html(html, statements):
+        """Appends pending static output to statements as one HTMLCode node."""
+        content = ''.join(html)
+        if content:
+            statements.append(HTMLCode(content))
+        html.clear()
+
+    def _statement(self, node):
+        """Returns list of statements replacing node."""
+        if isinstance(node, PrintStatement):
+            node.expression = self._expression(node.expression)
+            if isinstance(node.expression, Constant):
+                return [HTMLCode(str(node.expression.value))]
+        elif isinstance(node, IfStatement):
+            return self._if_statement(node)
+        elif isinstance(node, ForStatement):
+            node.collection = self._expression(node.collection)
+            node.inside_statements = self._statements(node.inside_statements)
+        elif isinstance(node, SetStatement):
+            node.value = self._expression(node.value)
+        elif isinstance(node, MacroStatement):
+            node.inside_statements = self._statements(node.inside_statements)
+        return [node]
+
+    def _if_statement(self, node):
+        node.comp_expression = self._expression(node.comp_expression)
+        node.inside_statements = self._statements(node.inside_statements)
+        if node.else_statement:
+            node.else_statement = self._statements(node.else_statement)
+        node.pushes_frame = defines_names(node.inside_statements) or defines_names(node.else_statement)
+        if not isinstance(node.comp_expression, Constant):
+            return [node]
+        branch = node.inside_statements if node.comp_expression.value else node.else_statement or []
+        if not defines_names(branch):
+            return branch
+        node.comp_expression = copy_location(Constant(True), node.comp_expression)
+        node.inside_statements = branch
+        node.else_statement = None
+        return [node]
+
+    def _expression(self, node):
+        for name, value in vars(node).items():
+            if isinstance(value, ParserNode):
+                setattr(node, name, self._expression(value))
+        if isinstance(node, MacroCall):
+            node.args[0][:] = [self._expression(arg) for arg in node.args[0]]
+        elif isinstance(node, (AndOperator, OrOperator)) and isinstance(node.operand1, Constant):
+            if bool(node.operand1.value) == isinstance(node, AndOperator):
+                return copy_location(node.operand2, node)
+            return copy_location(node.operand1, node)
+        elif isinstance(node, _FOLDABLE) and all(isinstance(child, Constant) for child in iter_child_nodes(node)):
+            try:
+                return copy_location(Constant(node.do_execute(None)), node)
+            except Exception:
+                pass
+        return node
@@ -1,27 +1,167 @@
-import re
-
 from html_template_parser.action import *
+from html_template_parser.compiler import *
 from html_template_parser.error import *
 from html_template_parser.lexem import *
+from html_template_parser.optimizer import *
+from html_template_parser.resolver import *
+from html_template_parser.scanner import *
 from html_template_parser.tokenizer import *
 
 __all__ = [
-    'parse'
+    'parse',
+    'render_stream',
+    'Template',
+    'BlankLineFilter',
+    'DEFAULT_CHUNK_SIZE'
 ]
 
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def parse(template, model=None, format='csv', tokenizer_class=Scanner, backend='interpreter', optimize=False,
+          filter_blank_lines=True, macro_cache_size=None, storage='rows', background=None, model_cache=False,
+          registry=None):
+    """Renders template with given model. Template is input stream, string, BufferSource or
+    already parsed Template. Backend 'interpreter' executes node tree directly,
+    'compiler' compiles it into Python function first. With optimize, node tree
+    is simplified by Optimizer before execution. With filter_blank_lines, whitespace-only
+    lines are removed from generated HTML. With macro_cache_size, output of pure macros
+    is memoized (see Template.from_source). Storage tells how model is kept in memory
+    and background where its records are decoded, with model_cache parsed model is cached
+    next to model file (see load_model). With registry, model is shared with other renders
+    using the same ModelRegistry."""
+    executable, scope_context = _prepare(template, model, format, tokenizer_class, backend, optimize,
+                                         macro_cache_size, storage, background, model_cache, registry)
+    generated_html = executable.execute(scope_context)
+    if filter_blank_lines:
+        return filter_html(generated_html)
+    return generated_html
+
+
+def render_stream(template, model=None, format='csv', tokenizer_class=Scanner, backend='interpreter', optimize=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE, filter_blank_lines=True, macro_cache_size=None, storage='rows',
+                  background=None, model_cache=False, registry=None):
+    """Renders template like parse, but yields generated HTML in chunks of at least chunk_size
+    characters (except the last one) while the model is being traversed."""
+    executable, scope_context = _prepare(template, model, format, tokenizer_class, backend, optimize,
+                                         macro_cache_size, storage, background, model_cache, registry)
+    chunks = _join_chunks(executable.stream(scope_context), chunk_size)
+    if filter_blank_lines:
+        return _filter_chunks(chunks)
+    return chunks
+
+
+def _prepare(template, model, format, tokenizer_class, backend, optimize, macro_cache_size, storage, background,
+             model_cache, registry):
+    if not isinstance(template, Template):
+        template = Template.from_source(template, tokenizer_class, Optimizer() if optimize else None,
+                                        macro_cache_size)
+    return template.get_executable(backend), ScopeContext(model, format, storage, background, model_cache, registry)
+
+
+def _join_chunks(parts, chunk_size):
+    chunk = []
+    length = 0
+    for part in parts:
+        chunk.append(part)
+        length += len(part)
+        if length >= chunk_size:
+            yield ''.join(chunk)
+            chunk.clear()
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _filter_chunks(chunks):
+    blank_line_filter = BlankLineFilter()
+    for chunk in chunks:
+        html = blank_line_filter.feed(chunk)
+        if html:
+            yield html
+    html = blank_line_filter.flush()
+    if html:
+        yield html
 
-def parse(template, model=None, format='csv'):
-    tokenizer = Tokenizer(template)
-    parser = Parser(tokenizer)
-    scope_context = ScopeContext(model, format)
 
-    tree = parser.generete_tree()
-    generated_html = tree.execute(scope_context)
-    return filter_html(generated_html)
+def filter_html(html):
+    return '\n'.join([line for line in html.split('\n') if line and not line.isspace()])
+
+
+class BlankLineFilter:
+    """Removes whitespace-only lines from HTML fed in chunks of any size. Line split between
+    chunks is kept until it is complete, so output is the same as filter_html of whole HTML."""
+
+    def __init__(self):
+        self._rest = []
+        self._separator = ''
+
+    def feed(self, chunk):
+        """Returns filtered HTML of lines completed by chunk."""
+        self._rest.append(chunk)
+        if '\n' not in chunk:
+            return ''
+        html, _, last_line = ''.join(self._rest).rpartition('\n')
+        self._rest = [last_line]
+        return self._filter(html)
+
+    def flush(self):
+        """Returns filtered HTML of the last, not terminated line."""
+        html = ''.join(self._rest)
+        self._rest = []
+        return self._filter(html)
+
+    def _filter(self, html):
+        html = filter_html(html)
+        if not html:
+            return ''
+        html = self._separator + html
+        self._separator = '\n'
+        return html
+
+
+class Template:
+    """Parsed template. Can be rendered any number of times without tokenizing and parsing."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._compiled = None
+
+    @classmethod
+    def from_source(cls, source, tokenizer_class=Scanner, optimizer=None, macro_cache_size=None):
+        """With macro_cache_size, each macro marked as pure by Resolver memoizes
+        up to macro_cache_size outputs, keyed on its arguments."""
+        tree = Parser(tokenizer_class(source)).generete_tree()
+        if optimizer:
+            tree = optimizer.optimize(tree)
+        tree = Resolver().resolve(tree)
+        if macro_cache_size:
+            for macro in _iter_macros(tree):
+                if macro.pure:
+                    macro.memo = MacroMemo(macro_cache_size)
+        return cls(tree)
+
+    def macro_cache_info(self):
+        """Returns CacheInfo of each memoized macro, by macro name."""
+        return {macro.identifier: macro.memo.cache_info() for macro in _iter_macros(self.tree) if macro.memo}
+
+    def get_executable(self, backend='interpreter'):
+        """Returns node tree or its compiled form, both can be executed with scope context."""
+        if backend == 'interpreter':
+            return self.tree
+        elif backend == 'compiler':
+            if self._compiled is None:
+                self._compiled = CompiledTemplate(self.tree)
+            return self._compiled
+        else:
+            raise ParserArgumentError('Invalid argument value \'{}\''.format(backend))
 
 
-def filter_html(html):
-    return '\n'.join(filter(lambda x: not re.match(r'^\s*$', x), html.split('\n')))
+def _iter_macros(node):
+    for child in iter_child_nodes(node):
+        if isinstance(child, MacroStatement):
+            yield child
+        yield from _iter_macros(child)
 
 
 class Parser:
@@ -58,7 +198,8 @@ class Parser:
             self.current_token = self.tokenizer.get_next_token()
         else:
             expected = reverted_keywords.get(token_id) or reverted_symbols.get(token_id)
-            raise ParserSyntaxError('Expected "{}"'.format(expected), self.current_token.line, self.current_token.position)
+            raise ParserSyntaxError.at('Expected "{}"'.format(expected), self.tokenizer.line_index,
+                                       self.current_token.offset)
 
     def unexpected_token_error(self):
         if self.current_token.content:
@@ -67,7 +208,8 @@ class Parser:
             unexpected = 'EOI'
         else:
             unexpected = reverted_keywords.get(self.current_token.id) or reverted_symbols.get(self.current_token.id)
-        return ParserSyntaxError('Unexpected "{}"'.format(unexpected), self.current_token.line, self.current_token.position)
+        return ParserSyntaxError.at('Unexpected "{}"'.format(unexpected), self.tokenizer.line_index,
+                                    self.current_token.offset)
 
     def html_code(self):
         node = HTMLCode(self.current_token.content)
@@ -170,9 +312,10 @@ class Parser:
         return PrintStatement(expression)
 
     def expression(self):
-        line, position = self.current_token.get_position()
+        offset = self.current_token.offset
         expression = self.or_expression()
-        expression.line = line
+        expression.offset = offset
+        expression.line_index = self.tokenizer.line_index
         return expression
 
     def or_expression(self):
@@ -280,9 +423,13 @@ class Parser:
             return expression
         elif self.current_token.id == Lexem.IDENTIFIER:
             name = self.current_token.content
+            offset = self.current_token.offset
             self.accept(Lexem.IDENTIFIER)
             if self.current_token.id == Lexem.LEFT_BRACKET:
-                return MacroCall(name, self.arguments())
+                call = MacroCall(name, self.arguments())
+                call.offset = offset
+                call.line_index = self.tokenizer.line_index
+                return call
             elif self.current_token.id == Lexem.LEFT_SQUARE_BRACKET:
                 return self.indexing(Variable(name))
             else:
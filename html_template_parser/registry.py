@@ -0,0 +1,111 @@
+import collections
+import hashlib
+import os
+import sys
+import threading
+import time
+import types
+
+from html_template_parser.model import *
+
+__all__ = [
+    'ModelRegistry',
+    'ModelStats'
+]
+
+ModelStats = collections.namedtuple('ModelStats', ['loads', 'hits', 'load_time', 'memory'])
+
+
+class _ModelEntry:
+    def __init__(self):
+        self.frame = None
+        self.checksum = None
+        self.mtime = None
+        self.size = None
+        self.load_time = None
+        self.loads = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Keeps models loaded once for each path, format and way of loading, shared by all renders
+    in process. Model files are revalidated by mtime and size, then by content hash, and loaded
+    again only when content has changed. Renders get read-only views of model frame, so names
+    set by template go to frame of its own ScopeContext. Files are hashed and loaded holding
+    only lock of their own entry, so renders of other models do not wait for them."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, format='csv', storage='rows', background=None, cache=False):
+        """Returns read-only frame of names of model located at path (see load_model)."""
+        key = (os.path.abspath(path), format, storage, background, cache)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _ModelEntry()
+        with entry.lock:
+            checksum = entry.checksum
+            if (entry.mtime, entry.size) != (stat.st_mtime_ns, stat.st_size):
+                checksum = self.checksum(path)
+            hit = entry.frame is not None and checksum == entry.checksum
+            if not hit:
+                start = time.perf_counter()
+                frame = types.MappingProxyType(load_model(path, format, storage, background, cache))
+                load_time = time.perf_counter() - start
+            with self._lock:
+                if hit:
+                    entry.hits += 1
+                else:
+                    entry.frame, entry.load_time, entry.checksum = frame, load_time, checksum
+                    entry.loads += 1
+                entry.mtime, entry.size = stat.st_mtime_ns, stat.st_size
+                return entry.frame
+
+    def stats(self):
+        """Returns ModelStats of each loaded model, keyed by path, format and way of loading.
+        Memory is estimated when stats are requested, models kept in files count only
+        objects held in memory."""
+        with self._lock:
+            entries = [(key, entry.loads, entry.hits, entry.load_time, entry.frame)
+                       for key, entry in self._entries.items() if entry.frame is not None]
+        return {key: ModelStats(loads, hits, load_time, estimate_size(frame))
+                for key, loads, hits, load_time, frame in entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def checksum(path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+def estimate_size(value):
+    """Returns approximate number of bytes taken by value and objects it holds, each counted once."""
+    seen = set()
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, (dict, types.MappingProxyType)):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, tuple):
+            stack.extend(tuple.__iter__(value))
+        elif isinstance(value, ColumnarModel):
+            stack.append(value.columns)
+    return size
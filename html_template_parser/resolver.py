@@ -0,0 +1,196 @@
+import collections
+
+from html_template_parser.action import *
+from html_template_parser.error import *
+
+__all__ = [
+    'Resolver'
+]
+
+
+class _Frame:
+    """Names which frame pushed by a block will or may hold at runtime. Names set in the block
+    become defined for statements following the set statement."""
+
+    def __init__(self, defined=(), assigned=(), dynamic=False, boundary=False):
+        self.defined = set(defined)
+        self.assigned = frozenset(assigned)
+        self.dynamic = dynamic
+        self.boundary = boundary
+
+
+def _iter_bound_names(node):
+    """Yields names bound by statements of the whole tree, each time they are bound."""
+    for child in iter_child_nodes(node):
+        if isinstance(child, (SetStatement, ForStatement)):
+            yield child.identifier
+        elif isinstance(child, MacroStatement):
+            yield child.identifier
+            yield from child.args_name
+        yield from _iter_bound_names(child)
+
+
+_COMPARISONS = {
+    LowerOperator: ('<', '>'),
+    LowerOrEqualOperator: ('<=', '>='),
+    GreaterOperator: ('>', '<'),
+    GreaterOrEqualOperator: ('>=', '<='),
+    EqualOperator: ('==', '=='),
+    NotEqualOperator: ('!=', '!=')
+}
+
+
+def _predicate(node, identifier):
+    """Returns predicate of condition made of comparisons of columns of loop variable with
+    constants, joined with and, or and not (see SQLiteRelation.filter), None for other conditions."""
+    if isinstance(node, (AndOperator, OrOperator)):
+        operands = (_predicate(node.operand1, identifier), _predicate(node.operand2, identifier))
+        if None in operands:
+            return None
+        return ('and' if isinstance(node, AndOperator) else 'or',) + operands
+    if isinstance(node, NotOperator):
+        operand = _predicate(node.operand, identifier)
+        return operand and ('not', operand)
+    if type(node) not in _COMPARISONS:
+        return None
+    operator, reflected = _COMPARISONS[type(node)]
+    column, constant = node.operand1, node.operand2
+    if isinstance(column, Constant):
+        column, constant, operator = constant, column, reflected
+    if (isinstance(column, Indexing) and isinstance(column.variable, BoundVariable)
+            and column.variable.identifier == identifier and isinstance(column.index, Constant)
+            and type(column.index.value) is str and isinstance(constant, Constant)):
+        return 'compare', operator, column.index.value, constant.value
+    return None
+
+
+def _assigned_names(statements):
+    """Names added by statements to the frame of block they are placed in."""
+    return [statement.identifier for statement in statements or []
+            if isinstance(statement, (SetStatement, MacroStatement))]
+
+
+class Resolver:
+    """Binds identifiers of node tree to scope frames, counted from the innermost one.
+    Frames pushed by blocks hold only loop variables, macro arguments and names set directly
+    in the block, so frames which cannot hold identifier are skipped statically. Loop variables,
+    macro arguments and names already set in the block become BoundVariable read directly
+    from their frame, other names are looked up dynamically from the first frame which may
+    hold them. Macro bodies see frames of the caller, so lookups beyond macro frame are
+    always dynamic. Macro which reads only names bound to its own frames and calls no other
+    macro is marked as pure. Macros defined once at top level, whose names are not bound
+    anywhere else, are hoisted and their calls are bound directly, with number of arguments
+    checked. Loops filtering their rows by condition get its predicate (see ForStatement).
+    Must run after Optimizer, which may remove blocks together with their frames."""
+
+    def __init__(self):
+        self._frames = []
+        self._macros = []
+        self._hoisted = {}
+
+    def resolve(self, tree):
+        self._hoisted = self._hoisted_macros(tree)
+        self._frames = [_Frame(assigned=_assigned_names(tree.subtrees), dynamic=True)]
+        self._statements(tree.subtrees)
+        self._frames = []
+        return tree
+
+    @staticmethod
+    def _hoisted_macros(tree):
+        counts = collections.Counter(_iter_bound_names(tree))
+        hoisted = {}
+        for statement in tree.subtrees:
+            if isinstance(statement, MacroStatement):
+                statement.hoisted = counts[statement.identifier] == 1
+                if statement.hoisted:
+                    hoisted[statement.identifier] = statement
+        return hoisted
+
+    def _statements(self, statements):
+        for statement in statements or []:
+            self._statement(statement)
+
+    def _block(self, frame, statements):
+        self._frames.append(frame)
+        self._statements(statements)
+        self._frames.pop()
+
+    def _statement(self, node):
+        if isinstance(node, PrintStatement):
+            node.expression = self._expression(node.expression)
+        elif isinstance(node, IfStatement) and not node.pushes_frame:
+            node.comp_expression = self._expression(node.comp_expression)
+            self._statements(node.inside_statements)
+            self._statements(node.else_statement)
+        elif isinstance(node, IfStatement):
+            assigned = _assigned_names(node.inside_statements) + _assigned_names(node.else_statement)
+            self._frames.append(_Frame())
+            node.comp_expression = self._expression(node.comp_expression)
+            self._frames.pop()
+            self._block(_Frame(assigned=assigned), node.inside_statements)
+            self._block(_Frame(assigned=assigned), node.else_statement)
+        elif isinstance(node, ForStatement):
+            self._frames.append(_Frame())
+            node.collection = self._expression(node.collection)
+            self._frames.pop()
+            self._block(_Frame([node.identifier], _assigned_names(node.inside_statements)), node.inside_statements)
+            self._push_down(node)
+        elif isinstance(node, SetStatement):
+            node.value = self._expression(node.value)
+            self._frames[-1].defined.add(node.identifier)
+        elif isinstance(node, MacroStatement):
+            frames, self._frames = self._frames, []
+            self._macros.append(node)
+            node.pure = True
+            self._block(_Frame(node.args_name, _assigned_names(node.inside_statements), boundary=True),
+                        node.inside_statements)
+            self._macros.pop()
+            self._frames = frames
+            self._frames[-1].defined.add(node.identifier)
+
+    @staticmethod
+    def _push_down(node):
+        conditions = [statement for statement in node.inside_statements if not isinstance(statement, HTMLCode)]
+        if len(conditions) != 1 or not isinstance(conditions[0], IfStatement) or conditions[0].else_statement:
+            return
+        node.predicate = _predicate(conditions[0].comp_expression, node.identifier)
+        if node.predicate:
+            node.skipped_output = ''.join(statement.html for statement in node.inside_statements
+                                          if isinstance(statement, HTMLCode))
+
+    def _expression(self, node):
+        for name, value in vars(node).items():
+            if isinstance(value, ParserNode):
+                setattr(node, name, self._expression(value))
+        if isinstance(node, MacroCall):
+            node.args[0][:] = [self._expression(arg) for arg in node.args[0]]
+            node.depth = self._bind(node.identifier)[0]
+            node.macro = self._hoisted.get(node.identifier)
+            if node.macro and len(node.args[0]) != len(node.macro.args_name):
+                raise ParserSyntaxError.at(MacroStatement.ARITY_ERROR.format(node.identifier, len(node.macro.args_name),
+                                                                             len(node.args[0])),
+                                           node.line_index, node.offset)
+            self._impure()
+        elif type(node) is Variable:
+            depth, exact = self._bind(node.identifier)
+            if exact:
+                return copy_location(BoundVariable(node.identifier, depth), node)
+            node.depth = depth
+            self._impure()
+        return node
+
+    def _impure(self):
+        if self._macros:
+            self._macros[-1].pure = False
+
+    def _bind(self, identifier):
+        """Returns depth of the first frame which may hold identifier and whether it surely does."""
+        depth = 0
+        for depth, frame in enumerate(reversed(self._frames)):
+            if identifier in frame.defined:
+                return depth, True
+            if identifier in frame.assigned or frame.dynamic:
+                return depth, False
+            if frame.boundary:
+                return depth + 1, False
+        return depth, False
@@ -0,0 +1,193 @@
+import mmap
+import os
+import re
+import sys
+
+from html_template_parser.error import *
+from html_template_parser.lexem import Lexem, keywords, symbols
+from html_template_parser.tokenizer import Token
+
+__all__ = [
+    'Scanner',
+    'BufferSource'
+]
+
+_TEMPLATE_TOKEN_PATTERN = r'''
+    \s*
+    (?:
+        (?P<number>\d+(?:\.\d*)?)
+      | (?P<string>'[^']*'|"[^"]*")
+      | (?P<name>NAME)
+      | (?P<symbol>\{%|%\}|\{\{|\}\}|\{\#|\#\}|<=|>=|==|!=|[-+/*%=<>,.()\[\]])
+    )'''
+
+
+class _Syntax:
+    """Patterns and lookup tables for either str or bytes sources."""
+
+    def __init__(self, encode, name_pattern):
+        self.template_token = re.compile(encode(_TEMPLATE_TOKEN_PATTERN.replace('NAME', name_pattern)), re.VERBOSE)
+        self.whitespace = re.compile(encode(r'\s*'))
+        self.template_opener_seconds = frozenset(encode(char) for char in '{%#')
+        self.opening_brace = encode('{')
+        self.comment_close = encode('#}')
+        self.dot = encode('.')
+        self.quotations = (encode("'"), encode('"'))
+        self.keywords = {encode(key): value for key, value in keywords.items()}
+        self.symbols = {encode(key): value for key, value in symbols.items()}
+
+
+_STR_SYNTAX = _Syntax(str, r'[^\W\d_]\w*')
+# Bytes patterns only know ASCII letters, so any non-ASCII byte is accepted as part of identifier.
+_BYTES_SYNTAX = _Syntax(str.encode, r'(?:[^\W\d_]|[\x80-\xff])(?:\w|[\x80-\xff])*')
+
+
+class BufferSource:
+    """Holds the whole template as a single str, or as an mmap of the template file.
+    Scanner works on it with integer offsets and slices, decoding only token contents."""
+    MMAP_THRESHOLD = 1024 * 1024
+
+    def __init__(self, text, encoding='utf-8'):
+        self.text = text
+        self.encoding = encoding
+        self.line_index = LineIndex(text)
+        self._file = None
+
+    @classmethod
+    def from_file(cls, path, encoding='utf-8', use_mmap=None):
+        """Reads template from path. By default files bigger than MMAP_THRESHOLD are memory-mapped."""
+        size = os.path.getsize(path)
+        if use_mmap is None:
+            use_mmap = size >= cls.MMAP_THRESHOLD
+        if not use_mmap or size == 0:
+            with open(path, encoding=encoding) as f:
+                return cls(f.read(), encoding)
+        file = open(path, 'rb')
+        source = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), encoding)
+        source._file = file
+        return source
+
+    def is_mapped(self):
+        return not isinstance(self.text, str)
+
+    def decode(self, part, errors='strict'):
+        if isinstance(part, str):
+            return part
+        return part.decode(self.encoding, errors)
+
+    def close(self):
+        if self._file:
+            self.line_index.detach()
+            self.text.close()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return len(self.text)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Scanner:
+    """Generates the same tokens as Tokenizer, but works on the whole source at once.
+    HTML is cut out with str.find, template tags are lexed with a single master regex.
+    Accepts input stream, template string or BufferSource."""
+
+    def __init__(self, input_stream):
+        if isinstance(input_stream, BufferSource):
+            self._buffer = input_stream
+        elif isinstance(input_stream, str):
+            self._buffer = BufferSource(input_stream)
+        else:
+            self._buffer = BufferSource(input_stream.read())
+        self._source = self._buffer.text
+        self._decode = self._buffer.decode
+        self._syntax = _BYTES_SYNTAX if self._buffer.is_mapped() else _STR_SYNTAX
+        self.line_index = self._buffer.line_index
+        self._tokens = self._scan()
+
+    def get_tokens(self):
+        """Token generator"""
+        token = self.get_next_token()
+        while token.id is not Lexem.EOI:
+            yield token
+            token = self.get_next_token()
+
+    def get_next_token(self):
+        return next(self._tokens)
+
+    def _scan(self):
+        end = len(self._source)
+        pos = 0
+        while pos < end:
+            opener = self._find_template_opener(pos)
+            if opener != pos:
+                yield Token(Lexem.HTML, self._decode(self._source[pos:opener]), pos)
+            pos = yield from self._scan_template(opener)
+        while True:
+            yield Token(Lexem.EOI, None, end)
+
+    def _find_template_opener(self, pos):
+        """Returns offset of the next '{{', '{%' or '{#', or the source length if there is none."""
+        source = self._source
+        brace = self._syntax.opening_brace
+        seconds = self._syntax.template_opener_seconds
+        index = source.find(brace, pos)
+        while index != -1 and source[index + 1:index + 2] not in seconds:
+            index = source.find(brace, index + 1)
+        return len(source) if index == -1 else index
+
+    def _scan_template(self, pos):
+        """Yields tokens of the template tag starting at pos. Returns offset where HTML starts again."""
+        source = self._source
+        syntax = self._syntax
+        end = len(source)
+        template_end_token_id = None
+        while pos < end:
+            match = syntax.template_token.match(source, pos)
+            if match is None:
+                self._raise_unrecognised(syntax.whitespace.match(source, pos).end())
+                return end
+            kind = match.lastgroup
+            content = match.group(kind)
+            start = match.start()
+            pos = match.end()
+            if kind == 'number':
+                if syntax.dot in content:
+                    yield Token(Lexem.NUMBER, float(content), start)
+                else:
+                    yield Token(Lexem.INT, int(content), start)
+            elif kind == 'string':
+                yield Token(Lexem.STRING, self._decode(content[1:-1]), start)
+            elif kind == 'name':
+                if content in syntax.keywords:
+                    yield Token(syntax.keywords[content], None, start)
+                else:
+                    yield Token(Lexem.IDENTIFIER, sys.intern(self._decode(content)), start)
+            else:
+                id = syntax.symbols[content]
+                if id == Lexem.COMMENT_OPEN:
+                    comment_end = source.find(syntax.comment_close, pos)
+                    return end if comment_end == -1 else comment_end + 2
+                if template_end_token_id is None:
+                    template_end_token_id = id + 1
+                elif id == template_end_token_id:
+                    yield Token(id, None, start)
+                    return pos
+                yield Token(id, None, start)
+        return pos
+
+    def _raise_unrecognised(self, offset):
+        """Raises syntax error for construction at offset, unless only whitespace is left."""
+        if offset == len(self._source):
+            return
+        quotation = self._source[offset:offset + 1] in self._syntax.quotations
+        char = self._decode(self._source[offset:offset + 4], 'ignore')[:1]
+        if quotation:
+            # like Tokenizer, which reads string until the end of input
+            raise ParserSyntaxError.at('Unclosed string', self.line_index, len(self._source) - 1)
+        raise ParserSyntaxError.at('Unrecognised construction: {}'.format(char), self.line_index, offset)
@@ -1,3 +1,5 @@
+import sys
+
 from html_template_parser.error import *
 from html_template_parser.lexem import Lexem, keywords, symbols
 
@@ -16,24 +18,23 @@ def is_whitespace(token):
 
 
 class Token:
-    def __init__(self, id, content=None, line=None, position=None):
+    __slots__ = ('id', 'content', 'offset')
+
+    def __init__(self, id, content=None, offset=None):
         self.id = id
         self.content = content
-        self.line = line
-        self.position = position
+        self.offset = offset
 
     def __eq__(self, other):
         return self.id == other.id and self.content == other.content
 
-    def get_position(self):
-        return self.line, self.position
-
 
 class Tokenizer:
     """Class generates tokens based on source_controller input stream."""
 
     def __init__(self, input_stream):
         self._source_controller = SourceController(input_stream)
+        self.line_index = LineIndex(newlines=self._source_controller.newlines)
         self._is_template = False
         self._template_end_token_id = None
         self._read_source = ''
@@ -47,26 +48,22 @@ class Tokenizer:
 
     def get_next_token(self):
         if self.is_end():
-            line, position = self.get_current_position()
-            return Token(Lexem.EOI, line=line, position=position)
+            return Token(Lexem.EOI, offset=self.get_current_offset())
 
-        line, position = self.get_current_position()
+        offset = self.get_current_offset()
         if self._is_template:
             token = self._get_template_token()
         else:
             token = self._get_html_token()
 
-        token.line = line
-        token.position = position
+        token.offset = offset
         return token
 
     def is_end(self):
         return bool(not self._read_source and not self._source_controller.has_char())
 
-    def get_current_position(self):
-        line = self._source_controller.line_number + int(self._source_controller.line_number == 0)
-        position = self._source_controller.position_number - len(self._read_source) + 1
-        return line, position
+    def get_current_offset(self):
+        return self._source_controller.offset - len(self._read_source)
 
     def _get_next_char(self):
         """First, reads from _read_source than from _source_controller.
@@ -166,7 +163,7 @@ class Tokenizer:
         if string in keywords:
             return Token(keywords[string])
         else:
-            return Token(Lexem.IDENTIFIER, string)
+            return Token(Lexem.IDENTIFIER, sys.intern(string))
 
     def _omit_comment(self):
         comment = ''
@@ -180,11 +177,13 @@ class Tokenizer:
 
 class SourceController:
     """Class reads from input stream and place characters in buffer.
-    Stores information about line and position."""
+    Stores information about line, position and offsets of read newlines."""
 
     def __init__(self, input_stream):
         self.line_number = 0
         self.position_number = 0
+        self.offset = 0
+        self.newlines = []
         self.buffer = ''
         self._input = input_stream
 
@@ -194,6 +193,7 @@ class SourceController:
             return ''
         result = self.buffer[self.position_number]
         self.position_number += 1
+        self.offset += 1
         return result
 
     def has_char(self):
@@ -206,6 +206,8 @@ class SourceController:
         if self.buffer:
             self.line_number += 1
             self.position_number = 0
+            if self.buffer.endswith('\n'):
+                self.newlines.append(self.offset + len(self.buffer) - 1)
         return self.buffer
 
     def _is_empty_buffer(self):
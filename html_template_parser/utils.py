@@ -1,3 +1,11 @@
+import collections
+import os
+import tempfile
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'size', 'maxsize', 'disk_hits'],
+                                   defaults=(0,))
+
+
 def is_float(s):
     try:
         float(s)
@@ -14,6 +22,14 @@ def is_int(s):
         return False
 
 
+def convert_string(value):
+    if is_int(value):
+        return int(value)
+    elif is_float(value):
+        return float(value)
+    return value
+
+
 def convert_strings_to_numbers(collection):
     if isinstance(collection, dict):
         for key, value in collection.items():
@@ -22,14 +38,78 @@ def convert_strings_to_numbers(collection):
             elif is_float(value):
                 collection[key] = float(value)
     elif isinstance(collection, list) or isinstance(collection, tuple):
-        new_values = []
-        for value in collection:
-            if is_int(value):
-                new_values.append(int(value))
-            elif is_float(value):
-                new_values.append(float(value))
-            new_values.append(float(value))
-        collection = new_values
+        collection = [convert_string(value) for value in collection]
     else:
         raise TypeError()
     return collection
+
+
+_BOOLEANS = {'True': True, 'False': False}
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return convert_string(value) if isinstance(value, str) else value
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _to_bool(value):
+    return _BOOLEANS.get(value, value)
+
+
+def _to_number(value):
+    return convert_string(value) if isinstance(value, str) else value
+
+
+def infer_converter(values):
+    """Returns converter of column, chosen by sample of its values: int, float, bool or None
+    when values are strings. Values which do not match converted type are converted one by one.
+    Columns without non-empty values in sample are converted one by one."""
+    values = [value for value in values if isinstance(value, str) and value]
+    if not values:
+        return _to_number
+    if all(is_int(value) for value in values):
+        return _to_int
+    if all(is_float(value) for value in values):
+        return _to_float
+    if all(value in _BOOLEANS for value in values):
+        return _to_bool
+    return None
+
+
+class RowConverter:
+    """Converts values of dict rows with converters of columns inferred from sample rows,
+    so that each column keeps one type."""
+
+    def __init__(self, fieldnames, sample):
+        self.converters = []
+        for name in fieldnames:
+            converter = infer_converter([row.get(name) for row in sample])
+            if converter:
+                self.converters.append((name, converter))
+
+    def __call__(self, row):
+        for name, converter in self.converters:
+            row[name] = converter(row.get(name))
+        return row
+
+
+def atomic_write(path, data):
+    """Writes bytes to path, so that concurrent readers see either old or complete new file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -2,7 +2,14 @@
 
 import unittest
 from tests.tokenizer_test import *
+from tests.scanner_test import *
 from tests.parser_test import *
+from tests.compiler_test import *
+from tests.environment_test import *
+from tests.optimizer_test import *
+from tests.resolver_test import *
+from tests.model_test import *
+from tests.registry_test import *
 
 if __name__ == '__main__':
     unittest.main()
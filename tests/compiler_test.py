@@ -0,0 +1,104 @@
+import io
+import os
+import unittest
+from contextlib import closing
+
+from html_template_parser.error import *
+from html_template_parser.parser import parse, render_stream
+
+
+class CompilerTest(unittest.TestCase):
+    """Compiler backend test cases, output is compared with interpreter"""
+    MODEL_FILE = '~compiler_test_model.csv'
+    TEMPLATES = [
+        '',
+        '<span>Hello {# comment #}World</span>',
+        '{{ ((8 / 2) + (2) * 3) + 7 % 3}} {{ 2 * -3.0 }} {{ 1 < 2 < 3 }} {{ 10 - 2 - 3 }}',
+        '{{ not True and False or not False and True}} {{ False or "str"}} {{ not "a" in "str"}}',
+        '{{ "Hello " + \'world\' }} {{ True + False }} {{ 2 and (False or not False) and True}}',
+        '{% if False %}Hello{% elif 5 < 3 %}World{% else %}!{% endif %}',
+        '{% set value = 123 %}{% if True %}{% set value = 4 %}{{ value }}{% endif %}{{ value }}',
+        "{{ model[-1]['age'] }} {{ model[0]['firstname'] + ' ' + model[0]['lastname'] }}",
+        "{% for row in model %}{% for char in row['firstname'] %}{{ char }}.{% endfor %}"
+        "{% if row['age'] > 18 %}adult{% else %}{{ row['age'] }}{% endif %}\n\n{% endfor %}",
+        "{% set firstname = 'Adam' %}{% macro name(firstname, suffix) %}{{ firstname + suffix }}{% endmacro %}"
+        "{{ name('Tom', '!') }} {{ firstname }} {% for row in model %}{{ name(row['lastname'], '?') }}{% endfor %}",
+    ]
+    ERROR_TEMPLATES = [
+        '{{17 / 0}}',
+        '{{ True in "str" }}',
+        '<p>\n{% set value = 123 %}\n{{ constant }}',
+        "{% for row in model %}\n{{ row['date_of_birth'] }}{% endfor %}",
+        "{% macro name(x) %}\n\n{{ x / 0 }}{% endmacro %}{{ name(1) }}",
+    ]
+    ERROR_LINES = [
+        ('{% macro m() %}\n{% for x in 5 %}{% endfor %}\n{% endmacro %}\n{% if m() %}{% endif %}', 2),
+        ('{% for x in "ab" %}\n{% for y in 5 %}\n{% endfor %}\n{% endfor %}', 2),
+        ('{% for x in "ab" %}\n{% for y in "c" %}\n{{ y + 1 }}\n{% endfor %}\n{% endfor %}', 3),
+        ('{% macro m(x) %}\n{{ x }}\n{% endmacro %}\n{{ m(\n1 + "a") }}', 4),
+        ('{% macro m(x) %}{{ x }}{% endmacro %}\n{{ 1 +\n m(1 / 0) }}', 3),
+        ('{% macro m(x) %}{{ x }}{% endmacro %}\n{{ m(\n1) + 1 }}', 2),
+        ('{% macro m(x) %}{{ x }}{% endmacro %}{% macro n(x) %}{% endmacro %}\n{{ m(\nn(\n1 / 0)) }}', 3),
+        ('{% macro m(x) %}\n{% set y = x / 0 %}\n{% endmacro %}\n{% set z = m(1) %}', 2),
+        ('{% set m = 1 %}\n{{ "a" +\n m() }}', 2),
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        with open(cls.MODEL_FILE, 'w+') as f:
+            f.write('firstname,lastname,salary,age\n'
+                    'Brad,Smith,2500.00,34\n'
+                    'Will,Pitt,3000.00,42\n'
+                    'Jennifer,Polez,100.00,17\n')
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.MODEL_FILE)
+
+    def render(self, template, backend):
+        with closing(io.StringIO(template)) as input_stream:
+            return parse(input_stream, self.MODEL_FILE, backend=backend)
+
+    def test_should_generate_same_html_as_interpreter(self):
+        for template in self.TEMPLATES:
+            with self.subTest(template=template):
+                self.assertEqual(self.render(template, 'interpreter'), self.render(template, 'compiler'))
+
+    def test_should_stream_same_html_as_interpreter(self):
+        for template in self.TEMPLATES:
+            with self.subTest(template=template):
+                chunks = render_stream(io.StringIO(template), self.MODEL_FILE, backend='compiler', chunk_size=1)
+                self.assertEqual(self.render(template, 'interpreter'), ''.join(chunks))
+
+    def test_should_raise_same_errors_as_interpreter(self):
+        for template in self.ERROR_TEMPLATES:
+            with self.subTest(template=template):
+                with self.assertRaises(ParserSemanticError) as expected:
+                    self.render(template, 'interpreter')
+                with self.assertRaises(ParserSemanticError) as compiled:
+                    self.render(template, 'compiler')
+                self.assertEqual(str(expected.exception), str(compiled.exception))
+
+    def test_should_report_same_error_lines_as_interpreter(self):
+        for template, line in self.ERROR_LINES:
+            for backend in ('interpreter', 'compiler'):
+                with self.subTest(template=template, backend=backend):
+                    with self.assertRaises(ParserSemanticError) as context:
+                        self.render(template, backend)
+                    self.assertTrue(str(context.exception).startswith('{}: error: '.format(line)))
+                    with self.assertRaises(ParserSemanticError) as streamed:
+                        list(render_stream(io.StringIO(template), self.MODEL_FILE, backend=backend))
+                    self.assertEqual(str(context.exception), str(streamed.exception))
+
+    def test_should_generate_example_page(self):
+        bin_directory = os.path.join(os.path.dirname(__file__), os.pardir, 'bin')
+        with open(os.path.join(bin_directory, 'input.html')) as f:
+            template = f.read()
+        self.assertEqual(self.render(template, 'interpreter'), self.render(template, 'compiler'))
+
+    def test_should_raise_error_on_unknown_backend(self):
+        self.assertRaises(ParserArgumentError, self.render, '', 'jit')
+
+
+if __name__ == '__main__':
+    unittest.main()
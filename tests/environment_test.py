@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from html_template_parser.environment import Environment, CacheInfo
+from html_template_parser.error import *
+from html_template_parser.parser import parse, Template
+
+
+class EnvironmentTest(unittest.TestCase):
+    """Environment class test cases"""
+    TEMPLATE_FILE = '~environment_test_template.html'
+
+    def setUp(self):
+        self.write_template('<span>{{ 2 + 3 }}</span>')
+        self.environment = Environment(cache_size=2)
+
+    def tearDown(self):
+        os.remove(self.TEMPLATE_FILE)
+
+    def write_template(self, content, mtime=None):
+        with open(self.TEMPLATE_FILE, 'w') as f:
+            f.write(content)
+        if mtime:
+            os.utime(self.TEMPLATE_FILE, ns=(mtime, mtime))
+
+    def test_should_return_cached_template(self):
+        template = self.environment.get_template(self.TEMPLATE_FILE)
+        self.assertIs(template, self.environment.get_template(self.TEMPLATE_FILE))
+        self.assertEqual(CacheInfo(1, 1, 0, 1, 2), self.environment.cache_info())
+
+    def test_should_render_cached_template(self):
+        template = self.environment.get_template(self.TEMPLATE_FILE)
+        self.assertIsInstance(template, Template)
+        self.assertEqual('<span>5</span>', parse(template))
+        self.assertEqual('<span>5</span>', parse(template, backend='compiler'))
+        self.assertEqual('<span>5</span>', self.environment.render(self.TEMPLATE_FILE))
+
+    def test_should_reload_changed_template(self):
+        self.environment.get_template(self.TEMPLATE_FILE)
+        self.write_template('<p>{{ 2 * 3 }}</p>', mtime=10 ** 9)
+        self.assertEqual('<p>6</p>', self.environment.render(self.TEMPLATE_FILE))
+        self.assertEqual((0, 2, 0), tuple(self.environment.cache_info())[:3])
+
+    def test_should_keep_template_when_only_mtime_changed(self):
+        template = self.environment.get_template(self.TEMPLATE_FILE)
+        os.utime(self.TEMPLATE_FILE, ns=(10 ** 9, 10 ** 9))
+        self.assertIs(template, self.environment.get_template(self.TEMPLATE_FILE))
+        self.assertEqual((1, 1, 0), tuple(self.environment.cache_info())[:3])
+
+    def test_should_evict_least_recently_used_template(self):
+        first = self.environment.from_string('{{ 1 }}')
+        self.environment.from_string('{{ 2 }}')
+        self.assertIs(first, self.environment.from_string('{{ 1 }}'))
+        self.environment.from_string('{{ 3 }}')
+        self.assertIs(first, self.environment.from_string('{{ 1 }}'))
+        self.environment.from_string('{{ 2 }}')
+        self.assertEqual(CacheInfo(hits=2, misses=4, evictions=2, size=2, maxsize=2), self.environment.cache_info())
+
+    def test_should_not_cache_invalid_template(self):
+        self.assertRaises(ParserSyntaxError, self.environment.from_string, '{{ 1 ')
+        self.assertEqual(0, self.environment.cache_info().size)
+
+
+
+class DiskCacheTest(unittest.TestCase):
+    """Environment disk cache test cases"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_should_load_template_parsed_by_other_environment(self):
+        for backend in ['interpreter', 'compiler']:
+            with self.subTest(backend=backend):
+                template = '<p>{{ 1 }}</p>{% set x = 2 %}{{ x * 3 }}'
+                first = Environment(cache_dir=self.cache_dir, backend=backend)
+                expected = parse(first.from_string(template), backend=backend)
+                second = Environment(cache_dir=self.cache_dir, backend=backend)
+                self.assertEqual(expected, parse(second.from_string(template), backend=backend))
+                self.assertEqual(1, second.cache_info().disk_hits)
+
+    def test_should_report_error_lines_of_loaded_template(self):
+        Environment(cache_dir=self.cache_dir).from_string('<p>\n\n{{ 1 / 0 }}</p>')
+        template = Environment(cache_dir=self.cache_dir).from_string('<p>\n\n{{ 1 / 0 }}</p>')
+        with self.assertRaises(ParserSemanticError) as context:
+            parse(template)
+        self.assertEqual('3: error: division by zero', str(context.exception))
+
+    def test_should_parse_again_when_cache_file_is_corrupted(self):
+        Environment(cache_dir=self.cache_dir).from_string('{{ 7 }}')
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), 'wb') as f:
+                f.write(b'garbage')
+        environment = Environment(cache_dir=self.cache_dir)
+        self.assertEqual('7', parse(environment.from_string('{{ 7 }}')))
+        self.assertEqual(0, environment.cache_info().disk_hits)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
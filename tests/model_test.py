@@ -0,0 +1,412 @@
+import array
+import contextlib
+import json
+import os
+import pickle
+import sqlite3
+import unittest
+from unittest import mock
+
+import yaml
+
+from html_template_parser.error import *
+from html_template_parser.model import *
+from html_template_parser.parser import Template, parse, render_stream
+from html_template_parser.utils import RowConverter, convert_strings_to_numbers
+
+
+def index_errors(model):
+    """Returns types and messages of errors raised by indexing model out of range and with string."""
+    errors = []
+    for index in (len(model), -len(model) - 1, 'a'):
+        try:
+            model[index]
+        except (IndexError, TypeError) as exc:
+            errors.append((type(exc), str(exc)))
+    return errors
+
+
+class LazyCSVModelTest(unittest.TestCase):
+    """LazyCSVModel class test cases"""
+    MODEL_FILE = '~model_test_model.csv'
+    ROWS = [
+        {'firstname': 'Brad', 'lastname': 'Smith', 'salary': 2500.0, 'age': 34},
+        {'firstname': 'Will', 'lastname': 'Pitt\nJr', 'salary': 3000.0, 'age': 42},
+        {'firstname': 'Jennifer', 'lastname': 'Połeź', 'salary': 100.0, 'age': 17},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        with open(cls.MODEL_FILE, 'w+', encoding='utf-8') as f:
+            f.write('firstname,lastname,salary,age\n'
+                    'Brad,Smith,2500.00,34\n'
+                    '\n'
+                    'Will,"Pitt\nJr",3000.00,42\n'
+                    'Jennifer,Połeź,100.00,17')
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.MODEL_FILE)
+
+    def test_should_iterate_rows_from_file(self):
+        model = LazyCSVModel(self.MODEL_FILE)
+        self.assertEqual(['firstname', 'lastname', 'salary', 'age'], model.fieldnames)
+        self.assertEqual(self.ROWS, list(model))
+        self.assertEqual(self.ROWS, list(model))
+
+    def test_should_access_rows_by_index(self):
+        model = LazyCSVModel(self.MODEL_FILE)
+        self.assertEqual(self.ROWS[1], model[1])
+        self.assertEqual(self.ROWS[-1], model[-1])
+        self.assertEqual(3, len(model))
+        self.assertRaises(IndexError, model.__getitem__, 3)
+        self.assertRaises(TypeError, model.__getitem__, 'age')
+        self.assertEqual(index_errors(self.ROWS), index_errors(model))
+
+    def test_should_render_same_html_as_rows_in_memory(self):
+        template = ("{% for row in model %}{{ row['lastname'] }}{% if row['age'] > 18 %}!{% endif %}{% endfor %}"
+                    "{{ model[-1]['firstname'] + model[0]['firstname'] }}")
+        self.assertEqual(parse(template, self.MODEL_FILE), parse(template, self.MODEL_FILE, storage='lazy'))
+
+    def test_should_raise_error_on_unknown_storage(self):
+        self.assertRaises(ParserArgumentError, load_model, self.MODEL_FILE, 'csv', 'disk')
+
+
+class LazyJSONArrayTest(unittest.TestCase):
+    """LazyJSONArray class test cases"""
+    MODEL_FILE = '~model_test_lazy.json'
+    ROWS = [{'name': 'Połeź "{}" \\ ]', 'age': index, 'tags': [index, {'x': ']'}]} for index in range(2000)]
+
+    @classmethod
+    def setUpClass(cls):
+        with open(cls.MODEL_FILE, 'w+', encoding='utf-8') as f:
+            json.dump({'title': 'T', 'model': cls.ROWS, 'empty': [], 'small': [1, 2]}, f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.MODEL_FILE)
+
+    def test_should_keep_large_arrays_in_file(self):
+        model = load_model(self.MODEL_FILE, 'json', 'lazy')
+        self.assertIsInstance(model['model'], LazyJSONArray)
+        self.assertEqual({'title': 'T', 'empty': [], 'small': [1, 2]},
+                         {key: value for key, value in model.items() if key != 'model'})
+        self.assertEqual(self.ROWS, list(model['model']))
+
+    def test_should_access_elements_by_index(self):
+        model = load_model(self.MODEL_FILE, 'json', 'lazy')['model']
+        self.assertEqual(self.ROWS[1], model[1])
+        self.assertEqual(self.ROWS[-1], model[-1])
+        self.assertEqual(2000, len(model))
+        self.assertRaises(IndexError, model.__getitem__, 2000)
+        self.assertEqual(index_errors(self.ROWS), index_errors(model))
+
+    def test_should_load_whole_file_not_holding_object(self):
+        with open(self.MODEL_FILE + '~', 'w+') as f:
+            f.write('[1, 2]')
+        try:
+            self.assertEqual([1, 2], load_model(self.MODEL_FILE + '~', 'json', 'lazy'))
+        finally:
+            os.remove(self.MODEL_FILE + '~')
+
+    def test_should_decode_values_split_between_chunks(self):
+        source = ('{"x": 2.5e1, "model": [12, 2.5, 3e2, -4.25E-1, 6E+1, "Połeź", true, null, '
+                  '{"a": [1.5, "]"]}, 7.0] , "y": -1}')
+        with open(self.MODEL_FILE + '~', 'w+', encoding='utf-8') as f:
+            f.write(source)
+        try:
+            expected = json.loads(source)
+            offset = len(source[:source.index('[')].encode('utf-8'))
+            for size in range(1, len(source.encode('utf-8')) + 1):
+                with self.subTest(size=size), mock.patch('html_template_parser.model._JSONReader.CHUNK_SIZE', size):
+                    self.assertEqual(expected, load_model(self.MODEL_FILE + '~', 'json', 'lazy'))
+                    model = LazyJSONArray(self.MODEL_FILE + '~', offset)
+                    self.assertEqual(expected['model'], list(model))
+                    self.assertEqual(expected['model'], [model[index] for index in range(len(model))])
+        finally:
+            os.remove(self.MODEL_FILE + '~')
+
+    def test_should_render_same_html_as_rows_in_memory(self):
+        template = "{% for row in model %}{{ row['age'] }}{{ row['name'] }}{% endfor %}{{ model[-1]['age'] }}{{ title }}"
+        self.assertEqual(parse(template, self.MODEL_FILE, 'json'), parse(template, self.MODEL_FILE, 'json', storage='lazy'))
+
+
+class NDJSONModelTest(unittest.TestCase):
+    """NDJSONModel class test cases"""
+    MODEL_FILE = '~model_test_model.ndjson'
+    ROWS = LazyCSVModelTest.ROWS
+
+    @classmethod
+    def setUpClass(cls):
+        with open(cls.MODEL_FILE, 'w+', encoding='utf-8') as f:
+            f.write('\n'.join(json.dumps(row, ensure_ascii=False) for row in cls.ROWS[:2]) + '\n  \n')
+            f.write(json.dumps(cls.ROWS[2]))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.MODEL_FILE)
+
+    def test_should_iterate_records_from_file(self):
+        class SmallBatchModel(NDJSONModel):
+            BATCH_SIZE = 7
+
+        for background in (None, 'thread', 'process'):
+            with self.subTest(background=background):
+                self.assertEqual(self.ROWS, list(NDJSONModel(self.MODEL_FILE, background)))
+                self.assertEqual(self.ROWS, list(SmallBatchModel(self.MODEL_FILE, background, 2)))
+
+    def test_should_access_records_by_index(self):
+        model = load_model(self.MODEL_FILE, 'ndjson')['model']
+        self.assertEqual(self.ROWS[1], model[1])
+        self.assertEqual(self.ROWS[-1], model[-1])
+        self.assertEqual(3, len(model))
+        self.assertRaises(IndexError, model.__getitem__, 3)
+        self.assertEqual(index_errors(self.ROWS), index_errors(model))
+
+    def test_should_render_same_html_as_rows_in_memory(self):
+        template = ("{% for row in model %}{{ row['lastname'] }}{% if row['age'] > 18 %}!{% endif %}{% endfor %}"
+                    "{{ model[-1]['firstname'] + model[0]['firstname'] }}")
+        self.assertEqual('Smith!Pitt\nJr!PołeźJenniferBrad', parse(template, self.MODEL_FILE, 'ndjson', filter_blank_lines=False))
+        self.assertEqual(parse(template, self.MODEL_FILE, 'ndjson', storage='columnar'),
+                         parse(template, self.MODEL_FILE, 'ndjson', background='thread'))
+
+    def test_should_decode_records_once_into_columns(self):
+        with mock.patch('json.loads', wraps=json.loads) as loads:
+            model = load_model(self.MODEL_FILE, 'ndjson', 'columnar')['model']
+        self.assertEqual(len(self.ROWS), loads.call_count)
+        self.assertEqual(self.ROWS, [dict(row) for row in model])
+
+    def test_should_raise_error_on_unknown_background(self):
+        self.assertRaises(ParserArgumentError, load_model, self.MODEL_FILE, 'ndjson', 'rows', 'fork')
+
+
+class YAMLModelTest(unittest.TestCase):
+    """YAML model loading test cases"""
+    MODEL_FILE = '~model_test_model.yaml'
+
+    def setUp(self):
+        self.write_model(LazyCSVModelTest.ROWS)
+
+    def tearDown(self):
+        for path in (self.MODEL_FILE, self.MODEL_FILE + '.cache'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write_model(self, rows):
+        with open(self.MODEL_FILE, 'w+', encoding='utf-8') as f:
+            json.dump({'model': rows}, f)
+
+    def test_should_load_model_safely(self):
+        self.assertEqual({'model': LazyCSVModelTest.ROWS}, load_model(self.MODEL_FILE, 'yaml'))
+        with open(self.MODEL_FILE, 'w+') as f:
+            f.write('model: !!python/object/apply:os.getcwd []')
+        self.assertRaises(yaml.YAMLError, load_model, self.MODEL_FILE, 'yaml')
+
+    def test_should_cache_parsed_model_until_file_changes(self):
+        self.assertEqual({'model': LazyCSVModelTest.ROWS}, load_model(self.MODEL_FILE, 'yaml', cache=True))
+        self.assertTrue(os.path.exists(self.MODEL_FILE + '.cache'))
+        self.assertEqual({'model': LazyCSVModelTest.ROWS}, load_model(self.MODEL_FILE, 'yaml', cache=True))
+        self.write_model(LazyCSVModelTest.ROWS[:1])
+        self.assertEqual({'model': LazyCSVModelTest.ROWS[:1]}, load_model(self.MODEL_FILE, 'yaml', cache=True))
+
+    def test_should_replace_broken_cache(self):
+        with open(self.MODEL_FILE + '.cache', 'w+') as f:
+            f.write('broken')
+        self.assertEqual({'model': LazyCSVModelTest.ROWS}, load_model(self.MODEL_FILE, 'yaml', cache=True))
+        self.assertEqual({'model': LazyCSVModelTest.ROWS}, load_model(self.MODEL_FILE, 'yaml', cache=True))
+
+
+class SQLiteRelationTest(unittest.TestCase):
+    """SQLiteRelation class test cases"""
+    MODEL_FILE = '~model_test_model.sqlite'
+    TEMPLATES = [
+        "{% for row in model %}{% if row['age'] > 18 %}{{ row['firstname'] }}{% endif %}{% endfor %}",
+        "<ul>{% for row in model %}\n  {% if 18 >= row['age'] or not row['lastname'] == 'Smith' %}"
+        "<li>{{ row['firstname'] }}</li>{% endif %}\n{% endfor %}</ul>",
+        "{% for row in model %}-{% if row['age'] != 42 and row['salary'] < 2600.5 %}{% set x = row['age'] %}{{ x }}"
+        "{% endif %}{% endfor %}",
+    ]
+
+    def setUp(self):
+        connection = sqlite3.connect(self.MODEL_FILE)
+        connection.execute('CREATE TABLE model (firstname TEXT, lastname TEXT, salary REAL, age INTEGER)')
+        connection.executemany('INSERT INTO model VALUES (?, ?, ?, ?)',
+                               [(row['firstname'], row['lastname'], row['salary'], row['age'])
+                                for row in LazyCSVModelTest.ROWS] * 3)
+        connection.execute('CREATE TABLE other (a INTEGER)')
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        os.remove(self.MODEL_FILE)
+
+    def execute(self, *statements):
+        with contextlib.closing(sqlite3.connect(self.MODEL_FILE)) as connection:
+            for statement in statements:
+                connection.execute(statement)
+            connection.commit()
+
+    def render(self, template, backend, push_down=True, stream=False):
+        template = Template.from_source(template)
+        if not push_down:
+            for node in template.tree.subtrees:
+                node.predicate = None
+        if stream:
+            return ''.join(render_stream(template, self.MODEL_FILE, 'sqlite', backend=backend))
+        return parse(template, self.MODEL_FILE, 'sqlite', backend=backend)
+
+    def test_should_read_rows_of_tables(self):
+        frame = load_model(self.MODEL_FILE, 'sqlite')
+        self.assertEqual(['model', 'other'], sorted(frame))
+        model = frame['model']
+        self.assertEqual(LazyCSVModelTest.ROWS * 3, list(model))
+        self.assertEqual(LazyCSVModelTest.ROWS[1], model[4])
+        self.assertEqual(LazyCSVModelTest.ROWS[-1], model[-1])
+        self.assertEqual(9, len(model))
+        self.assertRaises(IndexError, model.__getitem__, 9)
+        self.assertEqual(index_errors(LazyCSVModelTest.ROWS * 3), index_errors(model))
+        self.execute('DROP TABLE model')
+        frame = load_model(self.MODEL_FILE, 'sqlite')
+        self.assertIs(frame['other'], frame['model'])
+
+    def test_should_render_same_html_with_pushed_down_filter(self):
+        self.execute('DELETE FROM model WHERE rowid IN (2, 9)')
+        for template in self.TEMPLATES:
+            for backend in ('interpreter', 'compiler'):
+                with self.subTest(template=template, backend=backend):
+                    expected = self.render(template, backend, push_down=False)
+                    self.assertEqual(expected, self.render(template, backend))
+                    self.assertEqual(expected, self.render(template, backend, stream=True))
+
+    def test_should_render_same_html_with_filter_on_rows_without_gaps(self):
+        for template in self.TEMPLATES:
+            with self.subTest(template=template):
+                self.assertEqual(self.render(template, 'compiler', push_down=False), self.render(template, 'compiler'))
+
+    def test_should_filter_rows_in_database(self):
+        model = load_model(self.MODEL_FILE, 'sqlite')['model']
+        rows = list(model.filter(('compare', '>', 'age', 18), counted=True))
+        self.assertEqual([(0, LazyCSVModelTest.ROWS[0]), (0, LazyCSVModelTest.ROWS[1]), (1, LazyCSVModelTest.ROWS[0]),
+                          (0, LazyCSVModelTest.ROWS[1]), (1, LazyCSVModelTest.ROWS[0]), (0, LazyCSVModelTest.ROWS[1]),
+                          (1, None)], rows)
+        self.assertIsNone(model.filter(('compare', '>', 'height', 18)))
+
+    def test_should_keep_errors_of_values_of_other_types(self):
+        self.execute("INSERT INTO model VALUES ('Tom', 'Old', 1.0, 'old')",
+                     "INSERT INTO model VALUES ('Tom', NULL, 1.0, NULL)")
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                self.assertRaises(ParserSemanticError, self.render, self.TEMPLATES[0], backend)
+                self.assertRaises(ParserSemanticError, self.render, self.TEMPLATES[1], backend)
+                self.assertEqual(self.render(self.TEMPLATES[2], backend, push_down=False),
+                                 self.render(self.TEMPLATES[2], backend))
+
+
+class ColumnarModelTest(unittest.TestCase):
+    """ColumnarModel class test cases"""
+    MODEL_FILE = LazyCSVModelTest.MODEL_FILE
+    JSON_FILE = '~model_test_model.json'
+
+    @classmethod
+    def setUpClass(cls):
+        LazyCSVModelTest.setUpClass()
+        with open(cls.JSON_FILE, 'w+') as f:
+            json.dump({'model': LazyCSVModelTest.ROWS, 'mixed': [{'a': 1}, {'b': 2}], 'title': 'x'}, f)
+
+    @classmethod
+    def tearDownClass(cls):
+        LazyCSVModelTest.tearDownClass()
+        os.remove(cls.JSON_FILE)
+
+    def test_should_store_numeric_columns_in_arrays(self):
+        model = load_model(self.MODEL_FILE, storage='columnar')['model']
+        self.assertIsInstance(model.columns['age'], array.array)
+        self.assertIsInstance(model.columns['salary'], array.array)
+        self.assertEqual(LazyCSVModelTest.ROWS, list(model))
+        self.assertEqual(LazyCSVModelTest.ROWS[-1], model[-1])
+        self.assertEqual(3, len(model))
+        self.assertRaises(IndexError, model.__getitem__, 3)
+        self.assertRaises(KeyError, model[0].__getitem__, 'name')
+        self.assertEqual(index_errors(LazyCSVModelTest.ROWS), index_errors(model))
+
+    def test_should_store_json_lists_of_rows_by_columns(self):
+        model = load_model(self.JSON_FILE, 'json', 'columnar')
+        self.assertIsInstance(model['model'], ColumnarModel)
+        self.assertEqual(LazyCSVModelTest.ROWS, list(model['model']))
+        self.assertEqual([{'a': 1}, {'b': 2}], model['mixed'])
+        self.assertEqual('x', model['title'])
+
+    def test_should_render_same_html_as_rows_in_memory(self):
+        template = ("{% for row in model %}{{ row['lastname'] }}{% if row['age'] > 18 %}!{% endif %}{% endfor %}"
+                    "{{ model[-1]['firstname'] + model[0]['firstname'] }}{{ model[0] }}")
+        self.assertEqual(parse(template, self.MODEL_FILE), parse(template, self.MODEL_FILE, storage='columnar'))
+
+
+class CompactRowTest(unittest.TestCase):
+    """CompactRow class test cases"""
+    MODEL_FILE = LazyCSVModelTest.MODEL_FILE
+
+    @classmethod
+    def setUpClass(cls):
+        LazyCSVModelTest.setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        LazyCSVModelTest.tearDownClass()
+
+    def test_should_access_values_by_name(self):
+        model = load_model(self.MODEL_FILE, storage='compact')['model']
+        self.assertEqual(LazyCSVModelTest.ROWS, model)
+        self.assertIs(type(model[0]), type(model[1]))
+        self.assertEqual('Smith', model[0]['lastname'])
+        self.assertRaises(KeyError, model[0].__getitem__, 1)
+        self.assertIn('age', model[1])
+        self.assertEqual(['firstname', 'lastname', 'salary', 'age'], list(model[1]))
+        self.assertIsNone(model[1].get('name'))
+        self.assertRaises(KeyError, model[0].__getitem__, 'name')
+
+    def test_should_evaluate_expressions_like_dict_rows(self):
+        templates = ['{{ model[0] + model[0] }}', '{{ model[0] + 1 }}', '{{ 2 * model[0] }}', '{{ model[0] < model[1] }}',
+                     '{{ model[0][1] }}', '{{ model[0] == model[0] }}{{ model[0] != model[1] }}{{ model[0] == "a" }}',
+                     "{{ 'age' in model[0] }}{{ not model[0] }}"]
+        for template in templates:
+            with self.subTest(template=template):
+                results = []
+                for storage in ('rows', 'compact'):
+                    try:
+                        results.append(parse(template, self.MODEL_FILE, storage=storage))
+                    except ParserSemanticError as exc:
+                        results.append(str(exc).replace('CompactRow', 'dict'))
+                self.assertEqual(results[0], results[1])
+
+    def test_should_share_class_of_rows_with_same_header(self):
+        self.assertIs(compact_row_class(('a', 'b')), compact_row_class(('a', 'b')))
+        row = compact_row_class(('a', 'b'))([1, 2])
+        self.assertEqual(row, pickle.loads(pickle.dumps(row)))
+        self.assertEqual("{'a': 1, 'b': 2}", repr(row))
+
+    def test_should_render_same_html_as_rows_in_memory(self):
+        template = ("{% for row in model %}{{ row['lastname'] }}{% if row['age'] > 18 %}!{% endif %}{% endfor %}"
+                    "{{ model[-1]['firstname'] + model[0]['firstname'] }}{{ model[0] }}")
+        self.assertEqual(parse(template, self.MODEL_FILE), parse(template, self.MODEL_FILE, storage='compact'))
+
+
+class RowConverterTest(unittest.TestCase):
+    """RowConverter class test cases"""
+
+    def test_should_keep_one_type_in_column(self):
+        sample = [{'a': '1', 'b': '1.5', 'c': 'True', 'd': 'x'}, {'a': '2', 'b': '2', 'c': 'False', 'd': '3'}]
+        convert = RowConverter(['a', 'b', 'c', 'd'], sample)
+        self.assertEqual({'a': 3, 'b': 4.0, 'c': True, 'd': '4'}, convert({'a': '3', 'b': '4', 'c': 'True', 'd': '4'}))
+
+    def test_should_convert_values_not_matching_column_one_by_one(self):
+        convert = RowConverter(['a', 'b', 'c'], [{'a': '1', 'b': '', 'c': '1.5'}])
+        self.assertEqual({'a': 2.5, 'b': 7, 'c': 'x'}, convert({'a': '2.5', 'b': '7', 'c': 'x'}))
+        self.assertEqual({'a': '', 'b': None, 'c': ''}, convert({'a': '', 'b': None, 'c': ''}))
+
+    def test_should_convert_strings_in_list(self):
+        self.assertEqual([1, 2.5, 'a'], convert_strings_to_numbers(['1', '2.5', 'a']))
+
+
+if __name__ == '__main__':
+    unittest.main()
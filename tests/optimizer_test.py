@@ -0,0 +1,69 @@
+import io
+import unittest
+
+from html_template_parser.action import *
+from html_template_parser.error import *
+from html_template_parser.optimizer import Optimizer, count_nodes
+from html_template_parser.parser import Parser, parse
+from html_template_parser.scanner import Scanner
+
+
+class OptimizerTest(unittest.TestCase):
+    """Optimizer class test cases"""
+
+    def optimize(self, template):
+        return Optimizer().optimize(Parser(Scanner(template)).generete_tree())
+
+    def test_should_fold_constant_expression(self):
+        tree = self.optimize('<p>{{ (1 + 2) * 3 }}</p>')
+        self.assertEqual(1, len(tree.subtrees))
+        self.assertEqual('<p>9</p>', tree.subtrees[0].html)
+
+    def test_should_fold_constant_part_of_expression(self):
+        tree = self.optimize('{{ value + 2 * 3 }}')
+        expression = tree.subtrees[0].expression
+        self.assertIsInstance(expression, AdditionOperator)
+        self.assertIsInstance(expression.operand2, Constant)
+        self.assertEqual(6, expression.operand2.value)
+
+    def test_should_fold_boolean_operator_with_constant_operand(self):
+        tree = self.optimize('{{ False and value }}{{ True and value }}')
+        self.assertEqual('False', tree.subtrees[0].html)
+        self.assertIsInstance(tree.subtrees[1].expression, Variable)
+
+    def test_should_remove_statically_decided_branches(self):
+        tree = self.optimize('<p>{% if False %}A{% elif 2 > 1 %}B{% else %}C{% endif %}</p>')
+        self.assertEqual(1, len(tree.subtrees))
+        self.assertEqual('<p>B</p>', tree.subtrees[0].html)
+
+    def test_should_keep_frame_of_branch_defining_names(self):
+        template = '{% set x = 1 %}{% if True %}{% set x = 2 %}{{ x }}{% endif %}{{ x }}'
+        tree = self.optimize(template)
+        self.assertIsInstance(tree.subtrees[1], IfStatement)
+        self.assertEqual('21', parse(io.StringIO(template), optimize=True))
+
+    def test_should_keep_failing_expression_with_line(self):
+        with self.assertRaises(ParserSemanticError) as context:
+            parse(io.StringIO('<p>\n{{ 1 + 1 / 0 }}</p>'), optimize=True)
+        self.assertEqual('2: error: division by zero', str(context.exception))
+
+    def test_should_report_node_counts(self):
+        stream = io.StringIO()
+        optimizer = Optimizer(dump=True, stream=stream)
+        tree = optimizer.optimize(Parser(Scanner('<p>{{ 1 + 2 }}</p>{% if value %}{{ "a" }}b{% endif %}')).generete_tree())
+        self.assertEqual((12, 5), optimizer.node_counts)
+        self.assertEqual(5, count_nodes(tree))
+        self.assertEqual('nodes before optimization: 12, after: 5\n', stream.getvalue())
+
+    def test_should_generate_same_html_as_unoptimized_tree(self):
+        template = ('{% set a = 2 %}{% macro m(x) %}{{ x * (3 - 1) }}{% endmacro %}'
+                    '{% for c in "ab" + "c" %}{% if not False %}{{ c }}{{ m(a) }}{% endif %}{% endfor %}'
+                    '{{ "b" in "abc" }}{{ -(2 + 3) }}{{ 7 % 3 == 1 and "ok" }}')
+        for backend in ['interpreter', 'compiler']:
+            with self.subTest(backend=backend):
+                self.assertEqual(parse(io.StringIO(template), backend=backend),
+                                 parse(io.StringIO(template), backend=backend, optimize=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
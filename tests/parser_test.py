@@ -2,8 +2,10 @@ import io
 import unittest
 from contextlib import closing
 
+from html_template_parser.action import ScopeContext
 from html_template_parser.error import *
-from html_template_parser.parser import parse
+from html_template_parser.parser import BlankLineFilter, Parser, Template, filter_html, parse, render_stream
+from html_template_parser.scanner import Scanner
 
 
 class ParserTest(unittest.TestCase):
@@ -100,6 +102,53 @@ class ParserTest(unittest.TestCase):
         with closing(io.StringIO('{{17 / 3')) as input_stream:
             self.assertRaises(ParserSyntaxError, parse, input_stream)
 
+    def test_should_report_line_of_semantic_error(self):
+        with closing(io.StringIO('<p>\n</p>\n{{ 1 +\n 7 / 0 }}')) as input_stream:
+            with self.assertRaises(ParserSemanticError) as context:
+                parse(input_stream)
+            self.assertEqual('3: error: division by zero', str(context.exception))
+
+    def test_should_report_line_of_innermost_expression(self):
+        templates = {
+            '{% macro m(x) %}\n{{ x / 0 }}{% endmacro %}\n\n{{ m(1) }}': '2: error: division by zero',
+            '{% macro m(x) %}{{ x }}{% endmacro %}\n{{ 1 + m(\n1 / 0) }}': '2: error: division by zero',
+            '{% macro m(x) %}{% for c in x %}{% endfor %}{% endmacro %}\n\n{% if m(3) %}{% endif %}':
+                '1: error: \'int\' object is not iterable',
+            '\n{% for c in 3 %}{% endfor %}': '2: error: \'int\' object is not iterable',
+        }
+        for template, message in templates.items():
+            with self.subTest(template=template):
+                with self.assertRaises(ParserSemanticError) as context:
+                    parse(io.StringIO(template))
+                self.assertEqual(message, str(context.exception))
+
+    def test_should_report_line_for_each_kind_of_error(self):
+        templates = {
+            '\n{% for r in 5 %}{% endfor %}': '2: error: \'int\' object is not iterable',
+            '{% macro m(x) %}\n{% for c in x %}{% endfor %}{% endmacro %}\n{% if m(3) %}{% endif %}':
+                '2: error: \'int\' object is not iterable',
+            '\n{% if 1 / 0 %}{% endif %}': '2: error: division by zero',
+            '\n{% set x = 1 / 0 %}': '2: error: division by zero',
+            '{% macro m(x) %}{{ x }}{% endmacro %}\n{{ m(\n1 / 0) }}': '2: error: division by zero',
+            '{% macro m(x) %}\n{{ x / 0 }}{% endmacro %}\n\n{{ m(1) }}': '2: error: division by zero',
+            '\n{{ unknown }}': '2: error: Unknown identifier \'unknown\'',
+            '\n{{ model[0][\'name\'] }}': '2: error: Unknown key \'name\'',
+        }
+        for template, message in templates.items():
+            with self.subTest(template=template):
+                with self.assertRaises(ParserSemanticError) as context:
+                    parse(io.StringIO(template), self.MODEL_FILE)
+                self.assertEqual(message, str(context.exception))
+        with self.assertRaises(ParserSyntaxError) as context:
+            parse(io.StringIO('{% macro m(x) %}{{ x }}{% endmacro %}\n\n{{ m(1, 2) }}'))
+        self.assertEqual('3:3: error: Macro \'m\' takes 1 arguments, 2 given', str(context.exception))
+
+    def test_should_report_position_of_syntax_error(self):
+        with closing(io.StringIO('<p>\n{{17 / 3')) as input_stream:
+            with self.assertRaises(ParserSyntaxError) as context:
+                parse(input_stream)
+            self.assertEqual('2:9: error: Expected "}}"', str(context.exception))
+
     def test_should_print_string(self):
         with closing(io.StringIO('{{ "Hello world" }}')) as input_stream:
             output = parse(input_stream)
@@ -219,6 +268,13 @@ class ParserTest(unittest.TestCase):
             output = parse(input_stream)
             self.assertEqual('World', output)
 
+    def test_should_push_frame_only_for_condition_setting_names(self):
+        tree = Parser(Scanner('{% if a %}{% for x in b %}{% set y = x %}{% endfor %}{% else %}{% if c %}{% endif %}'
+                              '{% set z = 1 %}{% endif %}')).generete_tree()
+        statement = tree.subtrees[0]
+        self.assertTrue(statement.pushes_frame)
+        self.assertFalse(statement.else_statement[0].pushes_frame)
+
     def test_should_print_value_defined_in_set_statement(self):
         with closing(io.StringIO("{% set value = 123 %}{{ value }}")) as input_stream:
             output = parse(input_stream)
@@ -273,5 +329,60 @@ class ParserTest(unittest.TestCase):
             output = parse(input_stream, self.MODEL_FILE)
             self.assertEqual('Tom Adam', output)
 
+    def test_should_stream_same_html_as_parse(self):
+        template = ("<ul>\n{% for row in model %}\n  \n<li>{{ row['firstname'] }}</li>\n"
+                    "{% if row['age'] > 18 %}   \n<b>adult</b>{% endif %}\n{% endfor %}\n</ul>\n\n")
+        expected = parse(io.StringIO(template), self.MODEL_FILE)
+        for chunk_size in (1, 5, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                chunks = list(render_stream(io.StringIO(template), self.MODEL_FILE, chunk_size=chunk_size))
+                self.assertEqual(expected, ''.join(chunks))
+
+    def test_should_yield_chunks_before_rendering_whole_model(self):
+        chunks = render_stream(io.StringIO("{% for row in model %}{{ row['firstname'] }}\n{% endfor %}"
+                                           "{{ 17 / 0 }}"), self.MODEL_FILE, chunk_size=1)
+        self.assertEqual('Brad', next(chunks))
+        self.assertRaises(ParserSemanticError, list, chunks)
+
+    def test_should_pop_frames_of_failed_or_closed_stream(self):
+        template = Template.from_source('{% for x in "ab" %}{% if x %}{% set y = x %}{{ y }}{{ 1 / (x == "b") }}'
+                                        '{% endif %}{% endfor %}')
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                context = ScopeContext()
+                chunks = template.get_executable(backend).stream(context)
+                self.assertEqual('a', next(chunks))
+                chunks.close()
+                self.assertEqual(1, len(context.model))
+                context = ScopeContext()
+                self.assertRaises(ParserSemanticError, list, template.get_executable(backend).stream(context))
+                self.assertEqual(1, len(context.model))
+
+    def test_should_keep_blank_lines(self):
+        with closing(io.StringIO('<p>\n  \n{% if True %}\n{% endif %}</p>')) as input_stream:
+            output = parse(input_stream, filter_blank_lines=False)
+            self.assertEqual('<p>\n  \n\n</p>', output)
+
+    def test_should_filter_blank_lines_split_between_chunks(self):
+        html = '\n \n<p>\n\t\n  <b>x</b> \n\n\u00a0\n</p>\n'
+        for size in range(1, len(html) + 1):
+            with self.subTest(size=size):
+                blank_line_filter = BlankLineFilter()
+                output = [blank_line_filter.feed(html[i:i + size]) for i in range(0, len(html), size)]
+                output.append(blank_line_filter.flush())
+                self.assertEqual('<p>\n  <b>x</b> \n</p>', ''.join(output))
+                self.assertEqual(filter_html(html), ''.join(output))
+
+    def test_should_memoize_output_of_pure_macro(self):
+        source = ("{% macro name(x) %}{{ x }}.{% endmacro %}{% macro row(x) %}{{ model }}{% endmacro %}"
+                  "{{ name(1) }}{{ name(1) }}{{ name(1.0) }}{{ name(True) }}{{ name('1') }}{{ row(1) }}")
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                template = Template.from_source(source, macro_cache_size=3)
+                self.assertEqual('1.1.1.0.True.1.[]', parse(template, backend=backend))
+                self.assertEqual(['name'], list(template.macro_cache_info()))
+                info = template.macro_cache_info()['name']
+                self.assertEqual((1, 4, 1, 3, 3), (info.hits, info.misses, info.evictions, info.size, info.maxsize))
+
     if __name__ == '__main__':
         unittest.main()
@@ -0,0 +1,94 @@
+import os
+import threading
+import types
+import unittest
+from unittest import mock
+
+from html_template_parser.environment import Environment
+from html_template_parser.parser import parse
+from html_template_parser.model import load_model
+from html_template_parser.registry import ModelRegistry
+
+
+class ModelRegistryTest(unittest.TestCase):
+    """ModelRegistry class test cases"""
+    MODEL_FILE = '~registry_test_model.csv'
+    TEMPLATE = "{% for row in model %}{{ row['name'] }}{% endfor %}{% set model = 'x' %}{{ model }}"
+
+    def setUp(self):
+        self.write_model('name,age\nBrad,34\nWill,42\n', 10 ** 18)
+        self.registry = ModelRegistry()
+
+    def tearDown(self):
+        os.remove(self.MODEL_FILE)
+
+    def write_model(self, content, mtime):
+        with open(self.MODEL_FILE, 'w') as f:
+            f.write(content)
+        os.utime(self.MODEL_FILE, ns=(mtime, mtime))
+
+    def test_should_load_model_once(self):
+        frame = self.registry.get(self.MODEL_FILE)
+        self.assertIsInstance(frame, types.MappingProxyType)
+        self.assertIs(frame, self.registry.get(self.MODEL_FILE))
+        self.assertIsNot(frame, self.registry.get(self.MODEL_FILE, storage='compact'))
+        stats = self.registry.stats()[(os.path.abspath(self.MODEL_FILE), 'csv', 'rows', None, False)]
+        self.assertEqual((1, 1), (stats.loads, stats.hits))
+        self.assertGreater(stats.memory, 0)
+        self.assertGreaterEqual(stats.load_time, 0)
+
+    def test_should_reload_changed_model(self):
+        frame = self.registry.get(self.MODEL_FILE)
+        self.write_model('name,age\nBrad,34\nWill,42\n', 2 * 10 ** 18)
+        self.assertIs(frame, self.registry.get(self.MODEL_FILE))
+        self.write_model('name,age\nJennifer,17\n', 2 * 10 ** 18)
+        self.assertEqual([{'name': 'Jennifer', 'age': 17}], self.registry.get(self.MODEL_FILE)['model'])
+        self.assertEqual([(2, 1)], [stats[:2] for stats in self.registry.stats().values()])
+
+    def test_should_keep_names_set_by_render_out_of_shared_model(self):
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                self.assertEqual('BradWillx', parse(self.TEMPLATE, self.MODEL_FILE, backend=backend,
+                                                    registry=self.registry))
+                self.assertEqual('BradWillx', parse(self.TEMPLATE, self.MODEL_FILE, backend=backend,
+                                                    registry=self.registry))
+
+    def test_should_share_model_of_environment_renders(self):
+        with open('~registry_test_template.html', 'w') as f:
+            f.write(self.TEMPLATE)
+        try:
+            environment = Environment(registry=self.registry)
+            self.assertEqual('BradWillx', environment.render('~registry_test_template.html', self.MODEL_FILE))
+            self.assertEqual('BradWillx', ''.join(environment.render_stream('~registry_test_template.html',
+                                                                            self.MODEL_FILE)))
+        finally:
+            os.remove('~registry_test_template.html')
+        self.assertEqual([(1, 1)], [stats[:2] for stats in self.registry.stats().values()])
+
+    def test_should_not_wait_for_load_of_other_model(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load_model(path, *args):
+            if path == self.MODEL_FILE:
+                started.set()
+                release.wait(10)
+            return load_model(path, *args)
+
+        with open('~registry_test_other.csv', 'w') as f:
+            f.write('name\nJennifer\n')
+        try:
+            with mock.patch('html_template_parser.registry.load_model', slow_load_model):
+                thread = threading.Thread(target=self.registry.get, args=(self.MODEL_FILE,))
+                thread.start()
+                started.wait(10)
+                self.assertEqual([{'name': 'Jennifer'}], self.registry.get('~registry_test_other.csv')['model'])
+                self.assertTrue(thread.is_alive())
+                release.set()
+                thread.join()
+        finally:
+            os.remove('~registry_test_other.csv')
+        self.assertEqual([(1, 0), (1, 0)], [stats[:2] for stats in self.registry.stats().values()])
+
+
+if __name__ == '__main__':
+    unittest.main()
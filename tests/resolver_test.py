@@ -0,0 +1,163 @@
+import io
+import unittest
+
+from html_template_parser.action import *
+from html_template_parser.error import *
+from html_template_parser.parser import Parser, Template, parse
+from html_template_parser.resolver import Resolver
+from html_template_parser.scanner import Scanner
+
+
+class ResolverTest(unittest.TestCase):
+    """Resolver class test cases"""
+
+    def resolve(self, template):
+        return Resolver().resolve(Parser(Scanner(template)).generete_tree())
+
+    def render(self, template, backend='interpreter'):
+        return parse(io.StringIO(template), backend=backend)
+
+    def test_should_bind_loop_variable(self):
+        tree = self.resolve('{% for x in "ab" %}{% if True %}{{ x }}{% endif %}{% endfor %}')
+        variable = tree.subtrees[0].inside_statements[0].inside_statements[0].expression
+        self.assertIsInstance(variable, BoundVariable)
+        self.assertEqual(0, variable.depth)
+
+    def test_should_count_frame_of_condition_setting_names(self):
+        tree = self.resolve('{% for x in "ab" %}{% if True %}{% set y = x %}{{ x }}{% endif %}{% endfor %}')
+        variable = tree.subtrees[0].inside_statements[0].inside_statements[1].expression
+        self.assertIsInstance(variable, BoundVariable)
+        self.assertEqual(1, variable.depth)
+
+    def test_should_bind_macro_argument(self):
+        tree = self.resolve('{% macro m(x) %}{% for c in x %}{{ x }}{% endfor %}{% endmacro %}')
+        variable = tree.subtrees[0].inside_statements[0].inside_statements[0].expression
+        self.assertIsInstance(variable, BoundVariable)
+        self.assertEqual(1, variable.depth)
+
+    def test_should_skip_frames_which_cannot_define_name(self):
+        tree = self.resolve('{% for x in model %}{% for y in x %}{{ model }}{% endfor %}{% endfor %}')
+        variable = tree.subtrees[0].inside_statements[0].inside_statements[0].expression
+        self.assertIs(Variable, type(variable))
+        self.assertEqual(2, variable.depth)
+
+    def test_should_look_up_name_set_in_block_from_its_frame(self):
+        tree = self.resolve('{% for x in model %}{% if x %}{% set y = 1 %}{% endif %}{{ y }}{% endfor %}')
+        variable = tree.subtrees[0].inside_statements[1].expression
+        self.assertIs(Variable, type(variable))
+        self.assertEqual(1, variable.depth)
+
+    def test_should_look_up_names_outside_macro_in_caller_frames(self):
+        tree = self.resolve('{% macro m(x) %}{{ y }}{% endmacro %}')
+        variable = tree.subtrees[0].inside_statements[0].expression
+        self.assertIs(Variable, type(variable))
+        self.assertEqual(1, variable.depth)
+
+    def test_should_bind_name_set_earlier_in_block(self):
+        tree = self.resolve('{% for x in "ab" %}{{ y }}{% set y = x %}{{ y }}{% endfor %}')
+        before, after = tree.subtrees[0].inside_statements[0].expression, tree.subtrees[0].inside_statements[2].expression
+        self.assertIs(Variable, type(before))
+        self.assertEqual(0, before.depth)
+        self.assertIsInstance(after, BoundVariable)
+        self.assertEqual(0, after.depth)
+
+    def test_should_mark_macro_reading_only_its_names_as_pure(self):
+        tree = self.resolve('{% macro a(x) %}{% set y = x %}{% for c in y %}{{ c + y }}{% endfor %}{% endmacro %}'
+                            '{% macro b(x) %}{{ x + model }}{% endmacro %}'
+                            '{% macro c(x) %}{{ a(x) }}{% endmacro %}'
+                            '{% macro d(x) %}{% if x %}{% set y = x %}{% endif %}{{ y }}{% endmacro %}')
+        self.assertEqual([True, False, False, False], [macro.pure for macro in tree.subtrees])
+
+    def test_should_render_same_html_as_dynamic_lookup(self):
+        template = ('{% set y = "g" %}{% macro m(x) %}{% if x %}{% set y = x %}{% endif %}{{ y }}{% endmacro %}'
+                    '{% for x in "ab" %}{% if x == "a" %}{% set y = "l" %}{{ y }}{% endif %}{{ y }}{{ x }}'
+                    '{{ m(x) }}{{ m("") }}{% for x in "c" %}{{ x }}{% endfor %}{{ x }}{% endfor %}{{ y }}')
+        expected = Parser(Scanner(template)).generete_tree().execute(ScopeContext())
+        self.assertEqual('lgaggcagbggcbg', expected)
+        self.assertEqual(expected, self.render(template))
+        self.assertEqual(expected, self.render(template, 'compiler'))
+
+    def test_should_evaluate_macro_arguments_in_caller_scope(self):
+        template = '{% set b = 1 %}{% macro m(b, c) %}{{ b }}{{ c }}{% endmacro %}{{ m(2, b) }}'
+        self.assertEqual('21', self.render(template))
+        self.assertEqual('21', self.render(template, 'compiler'))
+
+    def test_should_hoist_macro_defined_once(self):
+        template = '{{ m(1) }}{% for x in "a" %}{{ m(x) }}{% endfor %}{% macro m(x) %}[{{ x }}]{% endmacro %}'
+        tree = self.resolve(template)
+        self.assertTrue(tree.subtrees[2].hoisted)
+        self.assertIs(tree.subtrees[2], tree.subtrees[0].expression.macro)
+        self.assertEqual('[1][a]', self.render(template))
+        self.assertEqual('[1][a]', self.render(template, 'compiler'))
+
+    def test_should_render_recursive_hoisted_macro(self):
+        source = '{% macro m(x) %}{% if x < 4 %}{{ x }}{{ m(x + 1) }}{% endif %}{% endmacro %}{{ m(1) }}'
+        for backend in ('interpreter', 'compiler'):
+            for macro_cache_size in (None, 2):
+                with self.subTest(backend=backend, macro_cache_size=macro_cache_size):
+                    template = Template.from_source(source, macro_cache_size=macro_cache_size)
+                    self.assertEqual('123', parse(template, backend=backend))
+                    self.assertEqual({}, template.macro_cache_info())
+
+    def test_should_report_error_raised_inside_recursive_macro(self):
+        template = ('{% macro m(x) %}{% if x < 3 %}{{ m(x + 1) }}\n'
+                    '{% else %}{{ x + "a" }}{% endif %}{% endmacro %}\n{{ m(1) }}')
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                with self.assertRaises(ParserSemanticError) as context:
+                    self.render(template, backend)
+                self.assertEqual('2: error: unsupported operand type(s) for +: \'int\' and \'str\'',
+                                 str(context.exception))
+
+    def test_should_not_hoist_macro_bound_elsewhere(self):
+        templates = [
+            '{% macro m() %}a{% endmacro %}{% macro m() %}b{% endmacro %}{{ m() }}',
+            '{% macro m() %}a{% endmacro %}{% for m in "x" %}{% endfor %}{{ m() }}',
+            '{% macro m() %}a{% endmacro %}{% macro n(m) %}{% endmacro %}{{ m() }}',
+            '{% if True %}{% macro m() %}a{% endmacro %}{% endif %}{{ 1 }}',
+        ]
+        for template in templates:
+            with self.subTest(template=template):
+                macros = [node for node in self.resolve(template).subtrees
+                          if isinstance(node, MacroStatement) and node.identifier == 'm']
+                self.assertFalse(any(macro.hoisted for macro in macros))
+
+    def test_should_check_number_of_arguments_of_hoisted_macro(self):
+        with self.assertRaises(ParserSyntaxError) as context:
+            self.resolve('{% macro m(x) %}{{ x }}{% endmacro %}\n<p>{{ 1 + m(1, 2) }}</p>')
+        self.assertEqual('2:10: error: Macro \'m\' takes 1 arguments, 2 given', str(context.exception))
+
+    def test_should_check_number_of_arguments_at_runtime(self):
+        template = '{% set y = 1 %}{% macro m(x) %}{{ x }}{% endmacro %}{% set m = m %}\n{{ m() }}'
+        for backend in ('interpreter', 'compiler'):
+            with self.subTest(backend=backend):
+                with self.assertRaises(ParserSemanticError) as context:
+                    self.render(template, backend)
+                self.assertEqual('2: error: Macro \'m\' takes 1 arguments, 0 given', str(context.exception))
+
+    def test_should_find_predicate_of_loop_filtering_rows(self):
+        loop = self.resolve("{% for row in model %}\n{% if 18 < row['age'] and not row['name'] == 'a' %}"
+                            "{{ row['name'] }}{% endif %}\n{% endfor %}").subtrees[0]
+        self.assertEqual(('and', ('compare', '>', 'age', 18), ('not', ('compare', '==', 'name', 'a'))), loop.predicate)
+        self.assertEqual('\n\n', loop.skipped_output)
+
+    def test_should_not_find_predicate_of_other_loops(self):
+        templates = [
+            "{% for row in model %}{% if row['age'] > 18 %}a{% else %}b{% endif %}{% endfor %}",
+            "{% for row in model %}{% if row['age'] > 18 %}a{% endif %}{{ row['age'] }}{% endfor %}",
+            "{% for row in model %}{% if row['age'] > x %}a{% endif %}{% endfor %}",
+            "{% for row in model %}{% if row['age'] > 18 or row %}a{% endif %}{% endfor %}",
+            "{% for x in model %}{% for row in x %}{% endfor %}{% if row['age'] > 18 %}a{% endif %}{% endfor %}",
+        ]
+        for template in templates:
+            with self.subTest(template=template):
+                self.assertIsNone(self.resolve(template).subtrees[0].predicate)
+
+    def test_should_raise_error_on_unknown_identifier(self):
+        with self.assertRaises(ParserSemanticError) as context:
+            self.render('{% for x in "a" %}\n{{ y }}{% endfor %}')
+        self.assertEqual('2: error: Unknown identifier \'y\'', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import io
+import os
+import unittest
+from contextlib import closing
+
+from html_template_parser.error import *
+from html_template_parser.lexem import *
+from html_template_parser.parser import Template, parse
+from html_template_parser.scanner import Scanner, BufferSource
+from html_template_parser.tokenizer import Tokenizer, Token
+from tests import tokenizer_test
+
+
+class ScannerTest(tokenizer_test.TokenizerTest):
+    """Scanner class test cases, runs all Tokenizer cases as well"""
+    tokenizer_class = Scanner
+
+    def test_should_return_identifier_with_underscores(self):
+        with closing(io.StringIO('{{ first_name_1 }}')) as input_stream:
+            tokenizer = Scanner(input_stream)
+            tokens = [Token(Lexem.PRINT_OPEN), Token(Lexem.IDENTIFIER, 'first_name_1'), Token(Lexem.PRINT_CLOSE)]
+            self.assertTokenListEqual(tokens, list(tokenizer.get_tokens()))
+
+    def test_should_return_eoi_after_trailing_whitespace(self):
+        with closing(io.StringIO('{{ 1 \n ')) as input_stream:
+            tokenizer = Scanner(input_stream)
+            tokens = [Token(Lexem.PRINT_OPEN), Token(Lexem.INT, 1)]
+            self.assertTokenListEqual(tokens, list(tokenizer.get_tokens()))
+
+    def test_should_return_token_positions(self):
+        with closing(io.StringIO('<ul>\n  {% for row in model %}')) as input_stream:
+            tokenizer = Scanner(input_stream)
+            positions = [tokenizer.line_index.position(token.offset) for token in tokenizer.get_tokens()]
+            self.assertEqual([(1, 1), (2, 3), (2, 5), (2, 9), (2, 13), (2, 16), (2, 22)], positions)
+
+    def test_should_raise_errors_at_same_positions_as_tokenizer(self):
+        templates = ['{{ 1 + }}', '{{ "unclosed }}', '{% if x %}\n  {% endfor %}', '<p>\n  {{ 1 $ 2 }}', '{{ x\n  "abc',
+                     '{{ "ż" +\n\n }}', '{%   set   %}', '{#  x #}{{ ) }}', '{{ a b }}', '{{ 17 / 3',
+                     '{{ m(\n1, 2) }}{% macro m(x) %}{% endmacro %}']
+        for template in templates:
+            with self.subTest(template=template):
+                with self.assertRaises(ParserSyntaxError) as expected:
+                    parse(io.StringIO(template), tokenizer_class=Tokenizer)
+                with self.assertRaises(ParserSyntaxError) as context:
+                    parse(io.StringIO(template), tokenizer_class=Scanner)
+                self.assertEqual(str(expected.exception), str(context.exception))
+
+    def test_should_raise_error_with_position(self):
+        with closing(io.StringIO('<span>\n{{ 2 ^ 1 }}</span>')) as input_stream:
+            tokenizer = Scanner(input_stream)
+            with self.assertRaises(ParserSyntaxError) as context:
+                list(tokenizer.get_tokens())
+            self.assertEqual('2:6: error: Unrecognised construction: ^', str(context.exception))
+
+    def test_should_return_same_tokens_as_tokenizer(self):
+        template = ('<ul>\n{% for row in model %}{% if row[\'age\'] >= 18 and not row[\'name\'] == "x" %}'
+                    '<li>{{ row[\'name\'] + \' \' + 2.5 * -3 % 2 }}</li>{# note #}{% endif %}{% endfor %}\n</ul>')
+        with closing(io.StringIO(template)) as first, closing(io.StringIO(template)) as second:
+            self.assertTokenListEqual(list(Tokenizer(first).get_tokens()), list(Scanner(second).get_tokens()))
+
+
+class BufferSourceTest(unittest.TestCase):
+    """BufferSource class test cases"""
+    TEMPLATE_FILE = '~scanner_test_template.html'
+    TEMPLATE = '<p>Zażółć</p>\n{% set gęś = "jaźń" %}{{ gęś }}{{ 1.5 }}'
+
+    @classmethod
+    def setUpClass(cls):
+        with open(cls.TEMPLATE_FILE, 'w', encoding='utf-8') as f:
+            f.write(cls.TEMPLATE)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.TEMPLATE_FILE)
+
+    def test_should_scan_string_source(self):
+        tokens = list(Scanner(self.TEMPLATE).get_tokens())
+        self.assertEqual(Token(Lexem.HTML, '<p>Zażółć</p>\n'), tokens[0])
+        self.assertEqual(Token(Lexem.IDENTIFIER, 'gęś'), tokens[3])
+
+    def test_should_return_same_tokens_from_memory_mapped_file(self):
+        with BufferSource.from_file(self.TEMPLATE_FILE, use_mmap=True) as source:
+            self.assertTrue(source.is_mapped())
+            mapped_scanner = Scanner(source)
+            mapped_tokens = [(token.id, token.content, mapped_scanner.line_index.position(token.offset))
+                             for token in mapped_scanner.get_tokens()]
+        scanner = Scanner(self.TEMPLATE)
+        tokens = [(token.id, token.content, scanner.line_index.position(token.offset))
+                  for token in scanner.get_tokens()]
+        self.assertEqual(tokens, mapped_tokens)
+
+    def test_should_report_error_after_memory_mapped_file_is_closed(self):
+        with BufferSource.from_file(self.TEMPLATE_FILE, use_mmap=True) as source:
+            scanner = Scanner(source)
+            tokens = list(scanner.get_tokens())
+        string_scanner = Scanner(self.TEMPLATE)
+        self.assertEqual([string_scanner.line_index.line(token.offset) for token in string_scanner.get_tokens()],
+                         [scanner.line_index.line(token.offset) for token in tokens])
+        with open(self.TEMPLATE_FILE + '~', 'w', encoding='utf-8') as f:
+            f.write('<p>Zażółć</p>\n<p>ł {{ 1 + "a" }}</p>')
+        try:
+            with BufferSource.from_file(self.TEMPLATE_FILE + '~', use_mmap=True) as source:
+                template = Template.from_source(source)
+            for backend in ('interpreter', 'compiler'):
+                with self.subTest(backend=backend):
+                    with self.assertRaises(ParserSemanticError) as context:
+                        parse(template, backend=backend)
+                    self.assertEqual('2: error: unsupported operand type(s) for +: \'int\' and \'str\'',
+                                     str(context.exception))
+        finally:
+            os.remove(self.TEMPLATE_FILE + '~')
+
+    def test_should_read_small_file_into_string(self):
+        with BufferSource.from_file(self.TEMPLATE_FILE) as source:
+            self.assertFalse(source.is_mapped())
+            self.assertEqual(self.TEMPLATE, source.text)
+
+
+if __name__ == '__main__':
+    unittest.main()